@@ -0,0 +1,260 @@
+"""Level X benchmark harness: runs the nodes outside ComfyUI against a synthetic LoRA library.
+
+Lightweight stand-ins for folder_paths, comfy.sd, comfy.utils and comfy.lora
+are installed before the package is imported. Every file the package would
+write next to itself (trigger DB, scan manifest, hash index, Civitai cache) is
+redirected into the temporary library, so the real lora_trigger.json is never
+touched.
+
+    python benchmarks/bench_lx_lora_node.py --sizes 1000,10000 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import argparse
+import contextlib
+import platform
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENGINES = ["SDXL", "FLUX", "FLUX2", "Qwen", "Zimage"]
+WORDS = ["neon", "portrait", "cyber", "witch", "gothic", "anime", "detail", "film", "ink", "pastel",
+         "armor", "forest", "studio", "retro", "glow", "sketch", "marble", "storm", "velvet", "chrome"]
+
+# ==============================================================================
+#  STAND-INS FOR COMFYUI MODULES
+# ==============================================================================
+class FakeTensor:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+class FakePatcher:
+    """Minimal ModelPatcher / CLIP: clone() and add_patches() are all the loaders use."""
+    def __init__(self):
+        self.patches = 0
+        self.model = None
+        self.cond_stage_model = None
+
+    def clone(self):
+        n = FakePatcher()
+        n.patches = self.patches
+        return n
+
+    def add_patches(self, patches, strength):
+        self.patches += len(patches)
+        return list(patches)
+
+def install_stubs(lora_root):
+    folder_paths = types.ModuleType("folder_paths")
+    folder_paths.base_path = os.path.dirname(lora_root)
+    state = {"list": None}
+
+    def get_filename_list(kind):
+        if state["list"] is None:
+            out = []
+            for root, _, files in os.walk(lora_root):
+                for f in files:
+                    if f.endswith((".safetensors", ".ckpt")):
+                        out.append(os.path.relpath(os.path.join(root, f), lora_root))
+            state["list"] = sorted(out)
+        return list(state["list"])  # ComfyUI also hands out a copy of its cached list
+
+    def get_full_path(kind, name):
+        path = os.path.join(lora_root, name)
+        return path if os.path.isfile(path) else None
+
+    folder_paths.get_folder_paths = lambda kind: [lora_root]
+    folder_paths.get_filename_list = get_filename_list
+    folder_paths.get_full_path = get_full_path
+    folder_paths.invalidate = lambda: state.update(list=None)
+
+    comfy = types.ModuleType("comfy")
+    comfy_utils = types.ModuleType("comfy.utils")
+    comfy_sd = types.ModuleType("comfy.sd")
+    comfy_lora = types.ModuleType("comfy.lora")
+
+    def load_torch_file(path, safe_load=False):
+        # Reads the file like the real loader would, then returns fake tensors
+        with open(path, "rb") as f:
+            size = len(f.read())
+        return {f"lora_unet_block_{i}.lora_down.weight": FakeTensor(size // 8) for i in range(8)}
+
+    def load_lora_for_models(model, clip, lora, strength_model, strength_clip):
+        model, clip = model.clone(), clip.clone()
+        model.add_patches(lora, strength_model)
+        clip.add_patches(lora, strength_clip)
+        return model, clip
+
+    comfy_utils.load_torch_file = load_torch_file
+    comfy_sd.load_lora_for_models = load_lora_for_models
+    comfy_lora.model_lora_keys_unet = lambda model, key_map: key_map
+    comfy_lora.model_lora_keys_clip = lambda model, key_map: key_map
+    comfy_lora.load_lora = lambda lora, key_map: dict(lora)
+    comfy.utils, comfy.sd, comfy.lora = comfy_utils, comfy_sd, comfy_lora
+
+    sys.modules.update({
+        "folder_paths": folder_paths, "comfy": comfy,
+        "comfy.utils": comfy_utils, "comfy.sd": comfy_sd, "comfy.lora": comfy_lora,
+    })
+    return folder_paths
+
+# ==============================================================================
+#  SYNTHETIC LIBRARY
+# ==============================================================================
+def safetensors_bytes(rng, i):
+    """A small but well-formed .safetensors file with Kohya/ModelSpec style metadata."""
+    meta = {"ss_network_dim": "16", "ss_base_model_version": "sdxl_base_v1-0"}
+    kind = i % 4
+    if kind == 0:
+        meta["modelspec.trigger_phrase"] = f"{rng.choice(WORDS)}style_{i}"
+    elif kind == 1:
+        tags = {f"{rng.choice(WORDS)}_{i}": rng.randint(5, 50), rng.choice(WORDS): rng.randint(1, 4)}
+        meta["ss_tag_frequency"] = json.dumps({"10_dataset": tags})
+    header = {"__metadata__": meta}
+    offset = 0
+    for n in range(4):
+        header[f"lora_unet_block_{n}.lora_down.weight"] = {"dtype": "F16", "shape": [16, 8], "data_offsets": [offset, offset + 256]}
+        offset += 256
+    raw = json.dumps(header).encode()
+    raw += b" " * (-len(raw) % 8)
+    return len(raw).to_bytes(8, "little") + raw + b"\0" * offset
+
+def build_library(root, n_files, db_size, seed=1234):
+    """Writes n_files LoRAs (+ sidecars) under root/loras and returns (lora_root, db dict, names)."""
+    rng = random.Random(seed)
+    lora_root = os.path.join(root, "loras")
+    names = []
+    for i in range(n_files):
+        engine = ENGINES[i % len(ENGINES)]
+        folder = os.path.join(lora_root, engine, f"set_{i // 500:04d}")
+        os.makedirs(folder, exist_ok=True)
+        stem = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}"
+        path = os.path.join(folder, stem + ".safetensors")
+        with open(path, "wb") as f:
+            f.write(safetensors_bytes(rng, i))
+        if i % 4 == 2:
+            with open(os.path.join(folder, stem + ".civitai.info"), "w", encoding="utf-8") as f:
+                json.dump({"trainedWords": [f"{stem}_trig", rng.choice(WORDS)]}, f)
+        elif i % 4 == 3 and i % 8 == 3:
+            with open(os.path.join(folder, stem + ".txt"), "w", encoding="utf-8") as f:
+                f.write(f"{stem} tag, {rng.choice(WORDS)}")
+        names.append(os.path.relpath(path, lora_root).replace("\\", "/"))
+
+    db = {}
+    for name in names[: min(db_size, len(names)) // 2]:
+        db[name] = f"{rng.choice(WORDS)}, {rng.choice(WORDS)} trigger"
+    while len(db) < db_size:
+        db[f"Archive/old_{len(db)}.safetensors"] = rng.choice(WORDS)
+    return lora_root, db, names
+
+# ==============================================================================
+#  TIMING
+# ==============================================================================
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = time.perf_counter() - start
+    return result, {"seconds": round(elapsed, 6), "ops": repeat, "per_op_us": round(elapsed / repeat * 1e6, 3)}
+
+def run_size(n_files, db_size, workers):
+    tmp = tempfile.mkdtemp(prefix="levelx_bench_")
+    try:
+        lora_root, db, names = build_library(tmp, n_files, db_size)
+        folder_paths = install_stubs(lora_root)
+        for mod in [m for m in sys.modules if m == "lx_lora_node" or m.startswith("lx_lora_node.")]:
+            del sys.modules[mod]
+        if REPO_ROOT not in sys.path: sys.path.insert(0, REPO_ROOT)
+        # Cold package import (what ComfyUI pays at boot); .pyc files are assumed to be compiled
+        _, import_time = timed(lambda: __import__("lx_lora_node"))
+        import lx_lora_node.lx_lora_node as lx
+        import lx_lora_node.hash_index as hash_index
+        import lx_lora_node.civitai_lookup as civitai_lookup
+        import lx_lora_node.sqlite_store as sqlite_store
+
+        # Keep every persisted file inside the temporary library
+        lx.get_db_path = lambda: os.path.join(tmp, "lora_trigger.json")
+        lx.get_manifest_path = lambda: os.path.join(tmp, "lora_scan_manifest.json")
+        hash_index.HASH_INDEX.path = os.path.join(tmp, "lora_hash_index.json")
+        civitai_lookup.get_cache_path = lambda: os.path.join(tmp, "civitai_cache.json")
+        sqlite_store.get_sqlite_path = lambda: os.path.join(tmp, "lora_trigger.sqlite")
+        with open(lx.get_db_path(), "w", encoding="utf-8") as f:
+            json.dump(db, f, indent=4)
+
+        metrics = {"package_import": import_time}
+        _, metrics["load_db_cold"] = timed(lx.load_db)
+        _, metrics["load_db_warm"] = timed(lx.load_db, repeat=20)
+
+        index = lx.get_trigger_index()
+        loader = lx.LevelX_MultiAutoLoRA()
+        rng = random.Random(99)
+        queries = [rng.choice(names) for _ in range(1000)]
+        it = iter(queries * 10)
+        _, metrics["get_trigger"] = timed(lambda: loader.get_trigger(next(it), index), repeat=len(queries))
+
+        folder_paths.get_filename_list("loras")  # Stand-in directory walk, not part of the measurement
+        _, metrics["get_filtered_loras_cold"] = timed(lambda: lx.get_filtered_loras("SDXL"))
+        _, metrics["get_filtered_loras_warm"] = timed(
+            lambda: [lx.get_filtered_loras(p) for p in [None] + ENGINES], repeat=20)
+
+        saver = lx.LevelX_TriggerSaver()
+        report, metrics["scan_local_full"] = timed(lambda: saver.manage_triggers("SCAN LOCAL (Fast)", "", "", workers))
+        metrics["scan_local_full"]["report"] = report[0]
+        report, metrics["scan_local_noop"] = timed(lambda: saver.manage_triggers("SCAN LOCAL (Fast)", "", "", workers))
+        metrics["scan_local_noop"]["report"] = report[0]
+
+        sdxl = [n for n in names if n.startswith("SDXL/")][:3]
+        model, clip = FakePatcher(), FakePatcher()
+        args = lambda prompt: (model, clip, prompt, sdxl[0], 0.8, sdxl[1], 0.6, sdxl[2], 0.4, True)
+        lx.LORA_CACHE.clear()
+        lx.PATCH_CACHE.clear()
+        _, metrics["apply_lora_stack_cold"] = timed(lambda: loader.apply_lora_stack(*args("a portrait")))
+        prompts = iter([f"prompt variant {i}" for i in range(200)])
+        _, metrics["apply_lora_stack_warm"] = timed(lambda: loader.apply_lora_stack(*args(next(prompts))), repeat=200)
+        lx.PATCH_CACHE.clear()
+        _, metrics["apply_lora_stack_file_cached"] = timed(lambda: loader.apply_lora_stack(*args("a portrait")))
+
+        folder_paths.invalidate()
+        return {"files": n_files, "db_entries": db_size, "metrics": metrics}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated library sizes")
+    parser.add_argument("--db-size", type=int, default=None, help="trigger DB entries (default: same as the library size)")
+    parser.add_argument("--workers", type=int, default=8, help="scan_workers passed to the Trigger Manager")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json", help="trigger DB backend")
+    parser.add_argument("--label", default="", help="free-form label stored in the output, e.g. a version or commit")
+    parser.add_argument("--output", default="-", help="JSON output file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    os.environ["LEVELX_TRIGGER_STORE"] = args.store
+    results = []
+    # The nodes print progress lines: send them to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"[Level X bench] {size} files...")
+            results.append(run_size(size, args.db_size or size, args.workers))
+
+    report = {
+        "label": args.label,
+        "store": args.store,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
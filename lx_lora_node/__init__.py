@@ -5,8 +5,12 @@ from .lx_lora_node import (
     LevelX_Flux2AutoLoRA,
     LevelX_QwenAutoLoRA,
     LevelX_ZImageAutoLoRA,
-    LevelX_TriggerSaver
+    LevelX_LoRAStack,
+    LevelX_TriggerInjector,
+    LevelX_TriggerSaver,
+    LevelX_StackBaker
 )
+from . import routes
 
 NODE_CLASS_MAPPINGS = {
     "LevelX_MultiAutoLoRA": LevelX_MultiAutoLoRA,
@@ -15,7 +19,10 @@ NODE_CLASS_MAPPINGS = {
     "LevelX_Flux2AutoLoRA": LevelX_Flux2AutoLoRA,
     "LevelX_QwenAutoLoRA": LevelX_QwenAutoLoRA,
     "LevelX_ZImageAutoLoRA": LevelX_ZImageAutoLoRA,
-    "LevelX_TriggerSaver": LevelX_TriggerSaver
+    "LevelX_LoRAStack": LevelX_LoRAStack,
+    "LevelX_TriggerInjector": LevelX_TriggerInjector,
+    "LevelX_TriggerSaver": LevelX_TriggerSaver,
+    "LevelX_StackBaker": LevelX_StackBaker
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -25,7 +32,10 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "LevelX_Flux2AutoLoRA": "🌀 Level X Auto-LoRA (FLUX 2)",
     "LevelX_QwenAutoLoRA": "👾 Level X Auto-LoRA (Qwen)",
     "LevelX_ZImageAutoLoRA": "🧿 Level X Auto-LoRA (Z-Image)",
-    "LevelX_TriggerSaver": "💾 Level X Trigger Manager"
+    "LevelX_LoRAStack": "📚 Level X Auto-LoRA Stack",
+    "LevelX_TriggerInjector": "🏷️ Level X Trigger Injector (Batch)",
+    "LevelX_TriggerSaver": "💾 Level X Trigger Manager",
+    "LevelX_StackBaker": "🧩 Level X Stack Baker"
 }
 
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
\ No newline at end of file
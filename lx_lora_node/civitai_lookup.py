@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import random
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from .fileio import write_json_atomic
+
+# ==============================================================================
+#  CIVITAI ONLINE LOOKUP ENGINE
+# ==============================================================================
+DEFAULT_BASE_URL = "https://civitai.com"
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+def get_cache_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "civitai_cache.json")
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        print(f"[Level X] ⚠️ Ignoring invalid {name}={os.environ.get(name)!r}")
+        return default
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads (rate <= 0 disables it)."""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval: return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now: time.sleep(slot - now)
+
+class CivitaiLookup:
+    """Concurrent, rate-limited Civitai search with a persistent TTL response cache.
+
+    Misses are cached too (with a shorter TTL) so known-unknown LoRAs are not
+    queried again on every SCAN ONLINE. Network failures are never cached.
+    Defaults come from LEVELX_CIVITAI_URL / _RPS / _TIMEOUT / _WORKERS.
+    """
+    def __init__(self, base_url=None, cache_path=None, rate=None, timeout=None, workers=None,
+                 max_retries=3, ttl=30 * 86400, negative_ttl=7 * 86400, run=None):
+        self.base_url = (base_url or os.environ.get("LEVELX_CIVITAI_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.cache_path = cache_path or get_cache_path()
+        self.timeout = timeout if timeout is not None else _env_float("LEVELX_CIVITAI_TIMEOUT", 15)
+        self.workers = max(1, int(workers if workers is not None else _env_float("LEVELX_CIVITAI_WORKERS", 4)))
+        self.limiter = RateLimiter(rate if rate is not None else _env_float("LEVELX_CIVITAI_RPS", 2))
+        self.max_retries = max_retries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.cache = self._load_cache()
+        self.requests = 0
+        self.cache_hits = 0
+        self.run = run  # Optional metrics.RunMetrics receiving per-request latencies
+
+    # --- Persistent cache ---
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[Level X] ⚠️ Ignoring unreadable Civitai cache: {e}")
+            return {}
+
+    def save_cache(self):
+        with self._lock:
+            if not self._dirty: return
+            snapshot = dict(self.cache)
+            self._dirty = False
+        try:
+            write_json_atomic(self.cache_path, snapshot)
+        except Exception as e:
+            print(f"[Level X] ⚠️ Could not save Civitai cache: {e}")
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self.cache.get(key)
+        if not entry: return False, None
+        ttl = self.ttl if entry.get("trigger") else self.negative_ttl
+        if time.time() - entry.get("t", 0) > ttl: return False, None
+        return True, entry.get("trigger")
+
+    def _cache_put(self, key, trigger):
+        with self._lock:
+            self.cache[key] = {"t": time.time(), "trigger": trigger}
+            self._dirty = True
+
+    # --- HTTP ---
+    def _get_json(self, url):
+        """GET with rate limiting, timeout and backoff on 429/5xx. Raises after the last retry."""
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait()
+            req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+            try:
+                with self._lock:
+                    self.requests += 1
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(req, timeout=self.timeout) as r:
+                        return json.loads(r.read().decode())
+                finally:
+                    if self.run is not None: self.run.observe("online_request", time.perf_counter() - started)
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRY_STATUS or attempt == self.max_retries: raise
+                retry_after = e.headers.get("Retry-After") if e.headers else None
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = 2 ** attempt + random.random()
+            except (urllib.error.URLError, TimeoutError):
+                if attempt == self.max_retries: raise
+                delay = 2 ** attempt + random.random()
+            time.sleep(min(delay, 60))
+
+    @staticmethod
+    def _trigger_from_models(data):
+        if "items" in data and len(data["items"]) > 0:
+            model = data["items"][0]
+            for version in model.get("modelVersions", []):
+                if version.get("trainedWords"):
+                    return ", ".join(version["trainedWords"])
+        return None
+
+    # --- Public API ---
+    def search(self, filename):
+        """Returns the trigger for a LoRA file name via text search, or None."""
+        query = os.path.splitext(os.path.basename(filename))[0].replace("_", " ").replace("-", " ")
+        key = "query:" + query.strip().lower()
+        hit, trigger = self._cache_get(key)
+        if hit:
+            with self._lock:
+                self.cache_hits += 1
+            return trigger
+        try:
+            url = f"{self.base_url}/api/v1/models?query={urllib.parse.quote(query)}&limit=1"
+            trigger = self._trigger_from_models(self._get_json(url))
+        except Exception as e:
+            print(f"[Level X] Online Search Failed for {filename}: {e}")
+            return None
+        self._cache_put(key, trigger)
+        return trigger
+
+    def search_by_hash(self, sha256):
+        """Returns the trigger of the model version with this file hash, or None."""
+        key = "hash:" + sha256.lower()
+        hit, trigger = self._cache_get(key)
+        if hit:
+            with self._lock:
+                self.cache_hits += 1
+            return trigger
+        try:
+            data = self._get_json(f"{self.base_url}/api/v1/model-versions/by-hash/{sha256}")
+            trigger = ", ".join(data["trainedWords"]) if data.get("trainedWords") else None
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                print(f"[Level X] Online Hash Lookup Failed for {sha256[:10]}: {e}")
+                return None
+            trigger = None
+        except Exception as e:
+            print(f"[Level X] Online Hash Lookup Failed for {sha256[:10]}: {e}")
+            return None
+        self._cache_put(key, trigger)
+        return trigger
+
+    def lookup(self, filename, sha256=None):
+        """Exact hash lookup when the hash is known, falling back to text search."""
+        if sha256:
+            trigger = self.search_by_hash(sha256)
+            if trigger: return trigger
+        return self.search(filename)
+
+    def search_many(self, filenames, hashes=None):
+        """Looks up several files concurrently. Returns {filename: trigger or None}.
+
+        hashes optionally maps a filename to its SHA256 for exact matching.
+        """
+        unique = list(dict.fromkeys(filenames))
+        hashes = hashes or {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                return dict(zip(unique, pool.map(lambda name: self.lookup(name, hashes.get(name)), unique)))
+        finally:
+            self.save_cache()
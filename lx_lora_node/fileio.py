@@ -0,0 +1,31 @@
+import os
+import json
+import contextlib
+
+# ==============================================================================
+#  ATOMIC FILE WRITES (shared by every module that persists a file)
+# ==============================================================================
+@contextlib.contextmanager
+def atomic_path(path):
+    """Yields a unique temp path next to path. On success it replaces path, on failure it is removed.
+
+    Concurrent writers never share a temp name, and a failed write leaves
+    neither a half-written target nor a stray temp file behind.
+    """
+    import tempfile  # Only needed by writers, kept out of node import
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        # mkstemp creates the file as 0600: keep the target's mode, or use the usual 0644
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """Writes JSON to a unique temp file next to path, then swaps it in with os.replace."""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
@@ -0,0 +1,167 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .fileio import write_json_atomic
+
+# ==============================================================================
+#  CONTENT HASH INDEX (SHA256 / Civitai AutoV2)
+# ==============================================================================
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+def get_hash_index_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "lora_hash_index.json")
+
+def hash_file(file_path):
+    """SHA256 of a file, read in fixed chunks into one reused buffer."""
+    import hashlib  # Loaded on first hash, not at node import
+    h = hashlib.sha256()
+    buf = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buf)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n: break
+            h.update(view[:n])
+    return h.hexdigest()
+
+def autov2(sha256):
+    """Civitai's AutoV2 short hash: the first 10 hex digits of the file SHA256."""
+    return sha256[:10].upper()
+
+class HashIndex:
+    """Persisted content-hash index of LoRA files (lora_hash_index.json next to the DB).
+
+    files:  {abs_path: [size, mtime, sha256]}, so each file version is hashed once
+    hashes: {sha256: {"autov2", "paths"}}, kept across renames and moves
+
+    Triggers are not stored here: TriggerIndex.lookup_hash resolves a hash
+    through its paths against the live DB, so trigger edits apply at once.
+
+    Hashing runs on a thread pool: hashlib releases the GIL while digesting, so
+    threads get real parallelism without re-importing ComfyUI in child processes.
+    """
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path or get_hash_index_path()
+        self.files = {}
+        self.hashes = {}
+        self._sig = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    # --- Persistence ---
+    def _file_sig(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def signature(self):
+        """(mtime, size) of the index file, None before the first save."""
+        return self._file_sig()
+
+    def refresh(self):
+        """Re-reads the index file if another process (or the manager) rewrote it."""
+        sig = self._file_sig()
+        with self._lock:
+            if sig == self._sig or self._dirty: return
+            files, hashes = {}, {}
+            if sig is not None:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get("version") == self.VERSION:
+                        files, hashes = data.get("files", {}), data.get("hashes", {})
+                except Exception as e:
+                    print(f"[Level X] ⚠️ Ignoring unreadable hash index: {e}")
+            self.files, self.hashes, self._sig = files, hashes, sig
+
+    def save(self):
+        with self._lock:
+            if not self._dirty: return
+            try:
+                write_json_atomic(self.path, {"version": self.VERSION, "files": self.files, "hashes": self.hashes})
+                self._sig = self._file_sig()
+                self._dirty = False
+            except Exception as e:
+                print(f"[Level X] ⚠️ Could not save hash index: {e}")
+
+    # --- Lookups ---
+    def hash_for(self, full_path):
+        """Returns the indexed SHA256 of a file, None if this version of it was never hashed."""
+        self.refresh()
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self.files.get(os.path.abspath(full_path))
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        return None
+
+    def autov2_map(self):
+        """{autov2: sha256} for every indexed hash (the first hash wins on a collision)."""
+        self.refresh()
+        with self._lock:
+            out = {}
+            for sha, info in self.hashes.items(): out.setdefault(info.get("autov2") or autov2(sha), sha)
+            return out
+
+    def paths_for_hash(self, sha):
+        with self._lock:
+            entry = self.hashes.get(sha)
+            return list(entry["paths"]) if entry else []
+
+    # --- Manager operation ---
+    def build(self, files, workers=8):
+        """Hashes [(rel_path, full_path), ...] and records the paths seen for each hash.
+
+        Returns the number of files that actually had to be hashed.
+        """
+        self.refresh()
+        todo = []
+        current = {}
+        for rel_path, full_path in files:
+            key = os.path.abspath(full_path)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue
+            cached = self.files.get(key)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                current[key] = cached
+            else:
+                todo.append((key, st))
+
+        def _hash(item):
+            key, st = item
+            try:
+                return [st.st_size, st.st_mtime_ns, hash_file(key)]
+            except OSError as e:
+                print(f"[Level X] Hashing failed for {key}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+            for (key, _), entry in zip(todo, pool.map(_hash, todo)):
+                if entry: current[key] = entry
+
+        with self._lock:
+            # Hash entries are kept for files that disappeared: a renamed file finds its trigger again
+            for rel_path, full_path in files:
+                entry = current.get(os.path.abspath(full_path))
+                if not entry: continue
+                sha = entry[2]
+                info = self.hashes.setdefault(sha, {"autov2": autov2(sha), "paths": []})
+                info.pop("trigger", None)  # Written by older versions, now resolved live
+                if rel_path not in info["paths"]: info["paths"].append(rel_path)
+            self.files = current
+            self._dirty = True
+        self.save()
+        return len(todo)
+
+HASH_INDEX = HashIndex()
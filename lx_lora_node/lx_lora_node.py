@@ -3,9 +3,16 @@ import comfy.sd
 import comfy.utils
 import os
 import json
-import urllib.parse
-import urllib.request
-from safetensors import safe_open
+import functools
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .fileio import atomic_path, write_json_atomic
+from .hash_index import HASH_INDEX
+from .metrics import NULL_RUN, start_run
 
 # ==============================================================================
 #  SHARED UTILS
@@ -13,38 +20,625 @@ from safetensors import safe_open
 def get_db_path():
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), "lora_trigger.json")
 
-def load_db():
-    path = get_db_path()
-    if not os.path.exists(path): return {}
+def get_manifest_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "lora_scan_manifest.json")
+
+def normalize_lora_key(name):
+    return name.replace("\\", "/").strip().lower()
+
+def resolve_lora_path(name):
+    """Full path of a LoRA name, resolved the same way by the loaders, the routes and the prefetcher."""
+    path = folder_paths.get_full_path("loras", name)
+    if not path and "\\" in name:
+        # Workflows saved on Windows keep backslashes in LoRA names
+        path = folder_paths.get_full_path("loras", name.replace("\\", "/"))
+    return path
+
+class TriggerIndex:
+    """Normalized full-path and leaf-name lookup tables built once per DB version.
+
+    Matches the original fuzzy rule: the first DB key (in file order) whose full
+    path or leaf name equals the input wins.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.full = {}
+        self.leaf = {}
+        for pos, (db_key, trigger) in enumerate(db.items()):
+            k_full = normalize_lora_key(db_key)
+            k_leaf = k_full.split("/")[-1]
+            self.full.setdefault(k_full, (pos, trigger))
+            self.leaf.setdefault(k_leaf, (pos, trigger))
+
+    def __len__(self):
+        return len(self.db)
+
+    def lookup(self, lora_name):
+        if not lora_name or lora_name == "None": return None
+        input_full = normalize_lora_key(lora_name)
+        input_leaf = input_full.split("/")[-1]
+        hits = [h for h in (self.full.get(input_full), self.leaf.get(input_leaf)) if h]
+        if not hits: return None
+        return min(hits)[1]
+
+    def lookup_exact(self, lora_name):
+        """Full-path match only (no leaf-name fallback)."""
+        if not lora_name or lora_name == "None": return None
+        hit = self.full.get(normalize_lora_key(lora_name))
+        return hit[1] if hit else None
+
+    def lookup_hash(self, sha256):
+        """Live trigger of the first DB entry whose file had this content when it was indexed."""
+        for rel_path in HASH_INDEX.paths_for_hash(sha256):
+            trigger = self.lookup_exact(rel_path)
+            if trigger: return trigger
+        return None
+
+# Process-wide cache: the JSON is only re-parsed when its mtime or size changes.
+_DB_LOCK = threading.Lock()
+_DB_CACHE = {"sig": None, "index": TriggerIndex({})}
+
+def _db_signature(path):
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"[Level X] ❌ Load DB Failed: {e}")
-        return {}
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+# --- Storage backend: "json" (default) or "sqlite" via LEVELX_TRIGGER_STORE ---
+_SQLITE_STORE = None
+
+def get_storage_backend():
+    return os.environ.get("LEVELX_TRIGGER_STORE", "json").strip().lower()
+
+def get_sqlite_store():
+    global _SQLITE_STORE
+    with _DB_LOCK:
+        if _SQLITE_STORE is None:
+            from .sqlite_store import SqliteTriggerStore
+            _SQLITE_STORE = SqliteTriggerStore(json_path=get_db_path())
+        return _SQLITE_STORE
+
+def get_trigger_index():
+    if get_storage_backend() == "sqlite":
+        return get_sqlite_store().index
+    path = get_db_path()
+    sig = _db_signature(path)
+    with _DB_LOCK:
+        if sig == _DB_CACHE["sig"]:
+            return _DB_CACHE["index"]
+        db = {}
+        if sig is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    db = json.load(f)
+            except Exception as e:
+                print(f"[Level X] ❌ Load DB Failed: {e}")
+                # Leave the signature unset so the next call retries the read
+                return _DB_CACHE["index"]
+        _DB_CACHE["sig"] = sig
+        _DB_CACHE["index"] = TriggerIndex(db)
+        return _DB_CACHE["index"]
+
+def get_trigger_db_version():
+    """Changes whenever the trigger DB does (file mtime/size; the WAL file too on SQLite)."""
+    if get_storage_backend() == "sqlite":
+        path = get_sqlite_store().path
+        return (_db_signature(path), _db_signature(path + "-wal"))
+    return _db_signature(get_db_path())
+
+def load_db():
+    if get_storage_backend() == "sqlite":
+        return get_sqlite_store().load()
+    # Callers are free to mutate the result, so hand out a copy of the cached dict
+    return dict(get_trigger_index().db)
 
 def save_db(db):
     try:
-        with open(get_db_path(), 'w', encoding='utf-8') as f:
-            json.dump(db, f, indent=4)
+        if get_storage_backend() == "sqlite":
+            get_sqlite_store().replace_all(db)
+        else:
+            path = get_db_path()
+            with _DB_LOCK:
+                write_json_atomic(path, db, indent=4)
+                _DB_CACHE["sig"] = _db_signature(path)
+                _DB_CACHE["index"] = TriggerIndex(dict(db))
         print(f"[Level X] 💾 DB Saved ({len(db)} entries)")
     except Exception as e:
         print(f"[Level X] ❌ Save Failed: {e}")
 
+_DB_WRITE_LOCK = threading.Lock()
+
+def set_triggers(entries):
+    """Adds or updates {key: trigger} entries (a single-row upsert on SQLite)."""
+    if not entries: return
+    if get_storage_backend() == "sqlite":
+        try:
+            get_sqlite_store().upsert(entries)
+            print(f"[Level X] 💾 DB Updated ({len(entries)} entries)")
+        except Exception as e:
+            print(f"[Level X] ❌ Save Failed: {e}")
+        return
+    with _DB_WRITE_LOCK:
+        # Re-read right before writing so edits made since the caller's load_db() survive.
+        # The lock only covers this process: JSON offers no guarantee between processes (use SQLite).
+        db = load_db()
+        db.update(entries)
+        save_db(db)
+
+# Same cap the safetensors library enforces on the JSON header
+SAFETENSORS_MAX_HEADER = 100 * 1024 * 1024
+# First read covers the length prefix plus a typical LoRA header in one syscall
+SAFETENSORS_FIRST_READ = 256 * 1024
+
+def read_safetensors_metadata(file_path):
+    """Returns the "__metadata__" dict of a .safetensors file without loading any tensors.
+
+    Reads the 8-byte little-endian header length and the JSON header directly.
+    Raises ValueError on a truncated, oversized or malformed header.
+    """
+    with open(file_path, "rb", buffering=0) as f:
+        head = f.read(SAFETENSORS_FIRST_READ)
+        if len(head) < 8:
+            raise ValueError("file too small for a safetensors header")
+        header_len = int.from_bytes(head[:8], "little")
+        if header_len < 2 or header_len > SAFETENSORS_MAX_HEADER:
+            raise ValueError(f"invalid header length {header_len}")
+        raw = head[8:8 + header_len]
+        while len(raw) < header_len:
+            chunk = f.read(header_len - len(raw))
+            if not chunk:
+                raise ValueError("truncated header")
+            raw += chunk
+
+    header = json.loads(raw)
+    if not isinstance(header, dict):
+        raise ValueError("header is not a JSON object")
+    meta = header.get("__metadata__")
+    if meta is None: return {}
+    if not isinstance(meta, dict):
+        raise ValueError("__metadata__ is not a JSON object")
+    return meta
+
+# ==============================================================================
+#  LORA FILE CACHE (shared by every loader variant)
+# ==============================================================================
+def _tensor_nbytes(value):
+    if hasattr(value, "nbytes"): return int(value.nbytes)
+    if hasattr(value, "numel") and hasattr(value, "element_size"):
+        return int(value.numel() * value.element_size())
+    return 0
+
+# Key prefixes of the text-encoder half of a LoRA (Kohya, diffusers and PEFT naming).
+# Everything else is applied to the diffusion model.
+TEXT_ENCODER_PREFIXES = (
+    "lora_te", "te_", "te1_", "te2_", "text_encoder", "text_encoders.", "lora_clip",
+    "clip_l.", "clip_g.", "t5xxl.",
+)
+
+def is_text_encoder_key(key):
+    return key.startswith(TEXT_ENCODER_PREFIXES)
+
+def lora_part(strength_model, strength_clip, has_clip=True):
+    """The half of a LoRA file a loader reads for these strengths: "model", "clip" or "all"."""
+    if strength_clip == 0 or not has_clip: return "model"
+    if strength_model == 0: return "clip"
+    return "all"
+
+def load_lora_part(lora_path, part="all"):
+    """Loads a full LoRA state dict, or only the "model" or "clip" keys.
+
+    For .safetensors the file is opened lazily (memory-mapped) and only the
+    selected tensors are read. Other formats are loaded whole, then filtered.
+    """
+    if part == "all":
+        return comfy.utils.load_torch_file(lora_path, safe_load=True)
+    want_clip = (part == "clip")
+    if lora_path.lower().endswith(".safetensors"):
+        from safetensors import safe_open
+        with safe_open(lora_path, framework="pt", device="cpu") as f:
+            return {k: f.get_tensor(k) for k in f.keys() if is_text_encoder_key(k) == want_clip}
+    return select_lora_part(comfy.utils.load_torch_file(lora_path, safe_load=True), part)
+
+def select_lora_part(state_dict, part):
+    """The "model" or "clip" keys of a full state dict (the tensors are shared, not copied)."""
+    if part == "all": return state_dict
+    want_clip = (part == "clip")
+    return {k: v for k, v in state_dict.items() if is_text_encoder_key(k) == want_clip}
+
+class LoraStateCache:
+    """Bounded LRU of loaded LoRA state dicts keyed by (resolved path, mtime, size).
+
+    A budget of 0 bytes disables caching entirely.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(lora_path):
+        real = os.path.realpath(lora_path)
+        st = os.stat(real)
+        return (real, st.st_mtime_ns, st.st_size)
+
+    def configure(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max(0, int(max_bytes))
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _evict(self):
+        while self._entries and self._bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    @staticmethod
+    def _full_key(key):
+        # A cached "all" entry also covers the "model" and "clip" halves of the same file
+        return key[:-1] + ("all",) if key[-1] != "all" else None
+
+    def contains(self, key):
+        """Whether load() would be served from the cache; leaves LRU order and hit/miss counters untouched."""
+        with self._lock:
+            return key in self._entries or self._full_key(key) in self._entries
+
+    def get(self, key):
+        with self._lock:
+            hit_key = key if key in self._entries else self._full_key(key)
+            entry = self._entries.get(hit_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(hit_key)
+            self.hits += 1
+        if hit_key == key: return entry[0]
+        # Served from the full file: the half is filtered, not stored again, so its tensors count once
+        return select_lora_part(entry[0], key[-1])
+
+    def put(self, key, state_dict):
+        size = sum(_tensor_nbytes(v) for v in state_dict.values())
+        with self._lock:
+            if size > self.max_bytes: return
+            # A full file supersedes cached halves of the same version
+            stale = [key] if key[-1] != "all" else [key, key[:-1] + ("model",), key[:-1] + ("clip",)]
+            for old_key in stale:
+                old = self._entries.pop(old_key, None)
+                if old is not None: self._bytes -= old[1]
+            self._entries[key] = (state_dict, size)
+            self._bytes += size
+            self._evict()
+
+    def load(self, lora_path, part="all", run=NULL_RUN):
+        """Loads a LoRA state dict, optionally only its "model" or "clip" half."""
+        try:
+            key = self.make_key(lora_path) + (part,)
+        except OSError:
+            key = None
+        if key is not None and self.max_bytes > 0:
+            cached = self.get(key)
+            if cached is not None:
+                run.count("lora_cache_hit")
+                return cached
+        run.count("lora_cache_miss")
+        state_dict = load_lora_part(lora_path, part)
+        if key is not None and self.max_bytes > 0: self.put(key, state_dict)
+        return state_dict
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            }
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        print(f"[Level X] ⚠️ Ignoring invalid {name}={os.environ.get(name)!r}")
+        return default
+
+# Budget in MB, override with LEVELX_LORA_CACHE_MB (0 disables the cache)
+LORA_CACHE = LoraStateCache(_env_int("LEVELX_LORA_CACHE_MB", 2048) * 1024 * 1024)
+
+# LEVELX_PREFETCH=1: each loader run schedules background reads of the LoRAs in pending prompts
+PREFETCH_QUEUE = os.environ.get("LEVELX_PREFETCH", "").strip().lower() in ("1", "true", "yes", "on")
+
+# ==============================================================================
+#  PATCHED MODEL CACHE (skip re-loading an unchanged stack)
+# ==============================================================================
+class PatchedModelCache:
+    """Remembers the loaded LoRA patches of a stack for a base model/clip and a stack signature.
+
+    Only the patch dicts (comfy.lora.load_lora output, LoRA tensors only) are
+    kept, never the patched clones: a ModelPatcher clone references its parent,
+    which would pin the checkpoint. A hit clones the base and re-adds the
+    patches, which skips file loads and key mapping. Base objects are tracked
+    through weak references, so an entry is dropped as soon as ComfyUI releases
+    the checkpoint it was built from.
+
+    The patches hold the LoRA weights themselves, so entries are bounded by
+    count and by the bytes of their tensors. Tensors shared with LORA_CACHE
+    are counted by both budgets.
+    """
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Re-entrant: weakref callbacks can fire from GC while the lock is held
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _ref(obj, callback=None):
+        if obj is None: return None
+        return weakref.ref(obj, callback)
+
+    @staticmethod
+    def _alive(ref):
+        return ref() if ref is not None else None
+
+    def get(self, model, clip, signature):
+        key = (id(model), id(clip), signature)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                model_ref, clip_ref, result, _ = entry
+                if self._alive(model_ref) is model and self._alive(clip_ref) is clip:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                # The id was recycled by a different object
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None: self._bytes -= entry[3]
+
+    def put(self, model, clip, signature, patches):
+        if self.max_entries <= 0: return
+        size = _patch_nbytes(patches)
+        if size > self.max_bytes: return
+        key = (id(model), id(clip), signature)
+
+        def _drop(ref, key=key):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and ref in (entry[0], entry[1]):
+                    self._remove(key)
+
+        try:
+            model_ref, clip_ref = self._ref(model, _drop), self._ref(clip, _drop)
+        except TypeError:
+            return  # Not weak-referenceable, never pin it
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (model_ref, clip_ref, patches, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+def _patch_nbytes(value, seen=None):
+    """Bytes of the tensors reachable from load_lora patches, each tensor counted once."""
+    if seen is None: seen = set()
+    if hasattr(value, "nbytes") or hasattr(value, "element_size"):
+        if id(value) in seen: return 0
+        seen.add(id(value))
+        return _tensor_nbytes(value)
+    if isinstance(value, dict): return sum(_patch_nbytes(v, seen) for v in value.values())
+    if isinstance(value, (list, tuple)): return sum(_patch_nbytes(v, seen) for v in value)
+    # Newer ComfyUI wraps each patch in a weight adapter object holding its tensors
+    weights = getattr(value, "weights", None)
+    return _patch_nbytes(weights, seen) if weights is not None else 0
+
+# Entry count and MB budget, override with LEVELX_PATCH_CACHE_SIZE / LEVELX_PATCH_CACHE_MB (0 disables the cache)
+PATCH_CACHE = PatchedModelCache(
+    _env_int("LEVELX_PATCH_CACHE_SIZE", 4), _env_int("LEVELX_PATCH_CACHE_MB", 1024) * 1024 * 1024
+)
+
+def stack_signature(stack):
+    """Hashable identity of a resolved stack: file version plus strengths per slot."""
+    sig = []
+    for name, lora_path, strength_model, strength_clip in stack:
+        try:
+            file_key = LoraStateCache.make_key(lora_path) if lora_path else (name, None)
+        except OSError:
+            file_key = (name, None)
+        sig.append((file_key, float(strength_model), float(strength_clip)))
+    return tuple(sig)
+
+# Concurrent file loads per stack
+LOAD_WORKERS = 4
+
+def build_lora_patches(model, clip, loras):
+    """Maps [(state_dict, sm, sc), ...] to [(patch_dict, sm, sc), ...] with key maps built once.
+
+    Returns None if this ComfyUI build lacks the comfy.lora helpers.
+    """
+    try:
+        import comfy.lora
+        key_map = {}
+        if model is not None: key_map = comfy.lora.model_lora_keys_unet(model.model, key_map)
+        if clip is not None: key_map = comfy.lora.model_lora_keys_clip(clip.cond_stage_model, key_map)
+    except (ImportError, AttributeError):
+        return None
+
+    convert = getattr(getattr(comfy, "lora_convert", None), "convert_lora", None)
+    patches = []
+    for lora, strength_model, strength_clip in loras:
+        if convert is not None: lora = convert(lora)
+        patches.append((comfy.lora.load_lora(lora, key_map), strength_model, strength_clip))
+    return patches
+
+def apply_lora_patches(model, clip, patches):
+    """Adds every patch onto one model/clip clone."""
+    new_model = model.clone() if model is not None else None
+    new_clip = clip.clone() if clip is not None else None
+    for loaded, strength_model, strength_clip in patches:
+        if new_model is not None and strength_model: new_model.add_patches(loaded, strength_model)
+        if new_clip is not None and strength_clip: new_clip.add_patches(loaded, strength_clip)
+    return (new_model, new_clip)
+
+def load_loras_for_models(model, clip, loras):
+    """Single-pass equivalent of chaining comfy.sd.load_lora_for_models over [(state_dict, sm, sc), ...].
+
+    Falls back to the chained call if this ComfyUI build lacks the comfy.lora helpers.
+    """
+    patches = build_lora_patches(model, clip, loras)
+    if patches is None:
+        for lora, strength_model, strength_clip in loras:
+            model, clip = comfy.sd.load_lora_for_models(model, clip, lora, strength_model, strength_clip)
+        return (model, clip)
+    return apply_lora_patches(model, clip, patches)
+
+def parse_lora_stack(text):
+    """Parses one LoRA per line as "name[:model_strength[:clip_strength]]".
+
+    A1111-style "<lora:name:0.8>" is accepted too. Blank lines and lines
+    starting with # are ignored. The clip strength defaults to the model strength.
+    """
+    entries = []
+    for line_no, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"): continue
+        if line.startswith("<lora:") and line.endswith(">"): line = line[6:-1]
+        parts = [p.strip() for p in line.split(":")]
+        if len(parts) > 3:
+            raise ValueError(f"[Level X] LoRA stack line {line_no}: expected name[:model[:clip]], got {line!r}")
+        try:
+            strengths = [float(p) for p in parts[1:]]
+        except ValueError:
+            raise ValueError(f"[Level X] LoRA stack line {line_no}: invalid strength in {line!r}")
+        strength_model = strengths[0] if strengths else 1.0
+        strength_clip = strengths[1] if len(strengths) > 1 else strength_model
+        entries.append((parts[0], strength_model, strength_clip))
+    return entries
+
+def merge_lora_stack(entries):
+    """Sums the strengths of repeated LoRAs (first position wins) and drops "None" and zero-strength entries."""
+    merged = {}
+    for name, strength_model, strength_clip in entries:
+        if not name or name == "None": continue
+        key = normalize_lora_key(name)
+        if key in merged:
+            first_name, sm, sc = merged[key]
+            merged[key] = (first_name, sm + strength_model, sc + strength_clip)
+        else:
+            merged[key] = (name, strength_model, strength_clip)
+    return [e for e in merged.values() if e[1] != 0 or e[2] != 0]
+
 # Helper to filter LoRA lists by folder prefix
+def normalize_folder_name(name):
+    # "Z-Image", "z_image" and "Zimage" all map to "zimage"
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+class LoraListIndex:
+    """LoRA filename list bucketed by normalized top-level folder.
+
+    Rebuilt only when folder_paths returns a different list. Nested folders
+    ("SDXL/Style/...") stay in their top-level bucket, in the original order.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None
+        self._all = ["None"]
+        self._buckets = {}
+
+    def _rebuild(self, all_loras):
+        buckets = {}
+        for x in all_loras:
+            top, sep, _ = x.replace("\\", "/").partition("/")
+            if sep: buckets.setdefault(normalize_folder_name(top), ["None"]).append(x)
+        self._source = all_loras
+        self._all = ["None"] + all_loras
+        self._buckets = buckets
+
+    def get(self, prefix=None):
+        all_loras = folder_paths.get_filename_list("loras")
+        with self._lock:
+            # List equality checks element identity first, so an unchanged list compares fast
+            if all_loras != self._source: self._rebuild(all_loras)
+            if not prefix: return self._all
+            return self._buckets.get(normalize_folder_name(prefix), ["None"])
+
+LORA_LIST_INDEX = LoraListIndex()
+
 def get_filtered_loras(prefix=None):
-    all_loras = folder_paths.get_filename_list("loras")
-    if not prefix: 
-        return ["None"] + all_loras
-    
-    # Filter for "PREFIX/" or "PREFIX\" 
-    # Also handles nested folders like "SDXL/Style/..."
-    filtered = [
-        x for x in all_loras 
-        if x.lower().startswith(prefix.lower() + "/") 
-        or x.lower().startswith(prefix.lower() + "\\")
-    ]
-    return ["None"] + filtered
+    return LORA_LIST_INDEX.get(prefix)
+
+# ==============================================================================
+#  TRIGGER ENGINE (tag-level injection, compiled per trigger set)
+# ==============================================================================
+# Runs of commas (with stray spaces before them) collapse into one comma
+_COMMA_RUN = re.compile(r"\s*,(?:\s*,)*")
+
+def split_tags(trigger):
+    return [t.strip() for t in trigger.split(",") if t.strip()]
+
+def _tag_key(tag):
+    return " ".join(tag.lower().split())
+
+class TriggerPlan:
+    """Prefix/suffix tags of one stack plus one compiled matcher per tag.
+
+    A tag counts as present when it appears in the prompt as whole words
+    (case-insensitive, any whitespace between words). Present tags are not
+    injected again, and each tag is injected at most once per prompt. Tags are
+    matched one by one, so "sky" is found inside "blue sky" as well.
+    """
+    def __init__(self, triggers):
+        self.prefix_tags = []
+        self.suffix_tags = []
+        seen = set()
+        for trigger, is_first in triggers:
+            for tag in split_tags(trigger):
+                key = _tag_key(tag)
+                if key in seen: continue
+                seen.add(key)
+                (self.prefix_tags if is_first else self.suffix_tags).append(tag)
+
+        self.matchers = {
+            key: re.compile(r"(?<!\w)" + r"\s+".join(re.escape(w) for w in key.split()) + r"(?!\w)", re.IGNORECASE)
+            for key in seen
+        }
+
+    def apply(self, prompt):
+        """Returns (final_prompt, triggers_added) for one prompt."""
+        present = {key for key, matcher in self.matchers.items() if matcher.search(prompt)}
+        prefix = [t for t in self.prefix_tags if _tag_key(t) not in present]
+        suffix = [t for t in self.suffix_tags if _tag_key(t) not in present]
+
+        parts = []
+        if prefix: parts.append(", ".join(prefix))
+        if prompt.strip(): parts.append(prompt.strip())
+        if suffix: parts.append(", ".join(suffix))
+
+        final_prompt = _COMMA_RUN.sub(",", ", ".join(parts))
+        return (final_prompt, ", ".join(prefix + suffix))
+
+@functools.lru_cache(maxsize=256)
+def build_trigger_plan(triggers):
+    """Cached TriggerPlan for a tuple of (trigger, is_first) pairs."""
+    return TriggerPlan(triggers)
 
 # ==============================================================================
 #  BASE CLASS (Logic Engine)
@@ -53,71 +647,120 @@ class LevelX_BaseAutoLoRA:
     def __init__(self):
         pass
 
-    RETURN_TYPES = ("MODEL", "CLIP", "STRING", "STRING")
-    RETURN_NAMES = ("MODEL", "CLIP", "final_prompt", "triggers_added")
+    RETURN_TYPES = ("MODEL", "CLIP", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("MODEL", "CLIP", "final_prompt", "triggers_added", "metrics_json")
     FUNCTION = "apply_lora_stack"
     CATEGORY = "Level X/Loaders"
 
-    def get_trigger(self, lora_name, db):
-        if not lora_name or lora_name == "None": return None
-        input_full = lora_name.replace("\\", "/").strip().lower()
-        input_leaf = input_full.split("/")[-1]
+    def get_trigger(self, lora_name, db, lora_path=None):
+        # Plain dicts are still accepted; TriggerIndex and the SQLite index are used as-is
+        if db is None or isinstance(db, dict): db = TriggerIndex(db or {})
+        trig = db.lookup(lora_name)
+        if lora_path and db.lookup_exact(lora_name) is None:
+            # Leaf names can collide and renamed files lose their key: prefer the content hash.
+            # Only hashes BUILD HASH INDEX already stored are used; files are never read here.
+            sha = HASH_INDEX.hash_for(lora_path)
+            by_hash = sha and db.lookup_hash(sha)
+            if by_hash: return by_hash
+        return trig
 
-        for db_key, trigger in db.items():
-            k_full = db_key.replace("\\", "/").strip().lower()
-            k_leaf = k_full.split("/")[-1]
-            if input_full == k_full or input_leaf == k_leaf:
-                return trigger
-        return None
+    def patch_stack(self, model, clip, stack, run=NULL_RUN):
+        """Applies [(name, path, strength_model, strength_clip), ...], reusing cached patches if possible."""
+        if not stack: return (model, clip)
+        with run.stage("patch_cache_lookup"):
+            signature = stack_signature(stack)
+            cached = PATCH_CACHE.get(model, clip, signature)
+        if cached is not None:
+            run.count("patch_cache_hit")
+            print(f"[Level X] ♻️ Reusing loaded patches ({len(stack)} LoRAs)")
+            with run.stage("patch"):
+                return apply_lora_patches(model, clip, cached)
+        run.count("patch_cache_miss")
+
+        # File loads for the whole stack run concurrently, then everything is patched in one pass
+        def _load(item):
+            name, lora_path, strength_model, strength_clip = item
+            # Only read the half of the file that will actually be applied
+            part = lora_part(strength_model, strength_clip, clip is not None)
+            print(f"[Level X] Loading: {name}" + ("" if part == "all" else f" ({part} only)"))
+            return LORA_CACHE.load(lora_path, part, run)
+
+        with run.stage("file_load"), ThreadPoolExecutor(max_workers=min(len(stack), LOAD_WORKERS)) as pool:
+            state_dicts = list(pool.map(_load, stack))
+
+        with run.stage("patch"):
+            loras = [(sd, sm, sc) for sd, (_, _, sm, sc) in zip(state_dicts, stack)]
+            patches = build_lora_patches(model, clip, loras)
+            if patches is None: return load_loras_for_models(model, clip, loras)
+            PATCH_CACHE.put(model, clip, signature, patches)
+            return apply_lora_patches(model, clip, patches)
+
+    def prefetch_upcoming(self):
+        """With LEVELX_PREFETCH=1, schedules a background scan of the pending prompts' LoRAs."""
+        if not PREFETCH_QUEUE: return
+        from .prefetch import get_prefetcher
+        get_prefetcher().prefetch_queue()
+
+    def compose_prompt(self, prompt, entries, db):
+        """Injects triggers for [(name, lora_path, is_first), ...]. Returns (final_prompt, triggers_added)."""
+        final_prompts, triggers_added = self.compose_prompts([prompt], entries, db)
+        return (final_prompts[0], triggers_added[0])
+
+    def compose_prompts(self, prompts, entries, db):
+        """Batch form of compose_prompt: triggers are resolved and compiled once for all prompts."""
+        triggers = tuple((self.get_trigger(name, db, lora_path) or "", is_first) for name, lora_path, is_first in entries)
+        plan = build_trigger_plan(triggers)
+        results = [plan.apply(prompt) for prompt in prompts]
+        return ([r[0] for r in results], [r[1] for r in results])
 
     def apply_lora_stack(self, model, clip, prompt, 
                          lora_1_name, lora_1_strength, 
                          lora_2_name, lora_2_strength, 
                          lora_3_name, lora_3_strength, 
-                         auto_trigger, optional_model_stack=None, optional_clip_stack=None):
+                         auto_trigger, optional_model_stack=None, optional_clip_stack=None,
+                         separate_clip_strength=False, lora_1_clip_strength=1.0,
+                         lora_2_clip_strength=1.0, lora_3_clip_strength=1.0):
 
+        run = start_run("loader")
+        self.prefetch_upcoming()
         current_model = optional_model_stack if optional_model_stack else model
         current_clip = optional_clip_stack if optional_clip_stack else clip
-        db = load_db() if auto_trigger else {}
-        
-        prefix_trigger = ""
-        suffix_triggers = []
-        all_injected = []
 
+        # Without separate_clip_strength the clip follows the model strength (original behaviour)
         stack_config = [
-            (lora_1_name, lora_1_strength, True),
-            (lora_2_name, lora_2_strength, False),
-            (lora_3_name, lora_3_strength, False)
+            (lora_1_name, lora_1_strength, lora_1_clip_strength if separate_clip_strength else lora_1_strength, True),
+            (lora_2_name, lora_2_strength, lora_2_clip_strength if separate_clip_strength else lora_2_strength, False),
+            (lora_3_name, lora_3_strength, lora_3_clip_strength if separate_clip_strength else lora_3_strength, False)
         ]
 
-        for name, strength, is_first in stack_config:
-            if name == "None" or strength == 0: continue
-            
-            lora_path = folder_paths.get_full_path("loras", name)
-            if lora_path:
-                print(f"[Level X] Loading: {name}")
-                lora_obj = comfy.utils.load_torch_file(lora_path, safe_load=True)
-                current_model, current_clip = comfy.sd.load_lora_for_models(
-                    current_model, current_clip, lora_obj, strength, strength
-                )
-            
-            if auto_trigger:
-                trig = self.get_trigger(name, db)
-                if trig:
-                    prompt_has_it = trig.lower() in prompt.lower()
-                    already_added = trig in all_injected or trig == prefix_trigger
-                    if not prompt_has_it and not already_added:
-                        if is_first: prefix_trigger = trig
-                        else: suffix_triggers.append(trig)
-                        all_injected.append(trig)
+        active = []
+        with run.stage("resolve"):
+            for name, strength, clip_strength, is_first in stack_config:
+                if name == "None" or (strength == 0 and clip_strength == 0): continue
+                active.append((name, strength, clip_strength, is_first, resolve_lora_path(name)))
 
-        parts = []
-        if prefix_trigger: parts.append(prefix_trigger)
-        if prompt.strip(): parts.append(prompt.strip())
-        if suffix_triggers: parts.append(", ".join(suffix_triggers))
-            
-        final_prompt = ", ".join(parts).replace(" ,", ",").replace(",,", ",")
-        return (current_model, current_clip, final_prompt, ", ".join(all_injected))
+        current_model, current_clip = self.patch_stack(
+            current_model, current_clip,
+            [(name, lora_path, strength, clip_strength) for name, strength, clip_strength, _, lora_path in active if lora_path],
+            run
+        )
+
+        with run.stage("trigger_db"):
+            db = get_trigger_index() if auto_trigger else None
+        with run.stage("compose"):
+            entries = [(name, lora_path, is_first) for name, _, _, is_first, lora_path in active] if auto_trigger else []
+            final_prompt, triggers_added = self.compose_prompt(prompt, entries, db)
+        return (current_model, current_clip, final_prompt, triggers_added, run.finish())
+
+# Optional inputs shared by every loader variant
+def loader_optional_inputs():
+    return {
+        "optional_model_stack": ("MODEL",), "optional_clip_stack": ("CLIP",),
+        "separate_clip_strength": ("BOOLEAN", {"default": False}),
+        "lora_1_clip_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
+        "lora_2_clip_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
+        "lora_3_clip_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
+    }
 
 # ==============================================================================
 #  VARIANT 1: UNIVERSAL (Shows Everything)
@@ -137,7 +780,7 @@ class LevelX_MultiAutoLoRA(LevelX_BaseAutoLoRA):
                 "lora_3_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "auto_trigger": ("BOOLEAN", {"default": True}),
             },
-            "optional": { "optional_model_stack": ("MODEL",), "optional_clip_stack": ("CLIP",), }
+            "optional": loader_optional_inputs()
         }
 
 # ==============================================================================
@@ -159,7 +802,7 @@ class LevelX_FluxAutoLoRA(LevelX_BaseAutoLoRA):
                 "lora_3_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "auto_trigger": ("BOOLEAN", {"default": True}),
             },
-            "optional": { "optional_model_stack": ("MODEL",), "optional_clip_stack": ("CLIP",), }
+            "optional": loader_optional_inputs()
         }
 
 # ==============================================================================
@@ -181,7 +824,7 @@ class LevelX_SDXLAutoLoRA(LevelX_BaseAutoLoRA):
                 "lora_3_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "auto_trigger": ("BOOLEAN", {"default": True}),
             },
-            "optional": { "optional_model_stack": ("MODEL",), "optional_clip_stack": ("CLIP",), }
+            "optional": loader_optional_inputs()
         }
 
 # ==============================================================================
@@ -203,7 +846,7 @@ class LevelX_Flux2AutoLoRA(LevelX_BaseAutoLoRA):
                 "lora_3_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "auto_trigger": ("BOOLEAN", {"default": True}),
             },
-            "optional": { "optional_model_stack": ("MODEL",), "optional_clip_stack": ("CLIP",), }
+            "optional": loader_optional_inputs()
         }
 
 # ==============================================================================
@@ -225,7 +868,7 @@ class LevelX_QwenAutoLoRA(LevelX_BaseAutoLoRA):
                 "lora_3_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "auto_trigger": ("BOOLEAN", {"default": True}),
             },
-            "optional": { "optional_model_stack": ("MODEL",), "optional_clip_stack": ("CLIP",), }
+            "optional": loader_optional_inputs()
         }
 
 # ==============================================================================
@@ -247,9 +890,369 @@ class LevelX_ZImageAutoLoRA(LevelX_BaseAutoLoRA):
                 "lora_3_strength": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "auto_trigger": ("BOOLEAN", {"default": True}),
             },
-            "optional": { "optional_model_stack": ("MODEL",), "optional_clip_stack": ("CLIP",), }
+            "optional": loader_optional_inputs()
+        }
+
+# ==============================================================================
+#  VARIANT 7: VARIABLE-LENGTH STACK (any number of LoRAs, one patch pass)
+# ==============================================================================
+class LevelX_LoRAStack(LevelX_BaseAutoLoRA):
+    FUNCTION = "apply_lora_list"
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "model": ("MODEL",), "clip": ("CLIP",),
+                "prompt": ("STRING", {"multiline": True, "default": ""}),
+                "lora_stack": ("STRING", {"multiline": True, "default": "# name:model_strength:clip_strength\n"}),
+                "auto_trigger": ("BOOLEAN", {"default": True}),
+            }
+        }
+
+    def apply_lora_list(self, model, clip, prompt, lora_stack, auto_trigger):
+        run = start_run("stack")
+        self.prefetch_upcoming()
+        resolved = []
+        with run.stage("resolve"):
+            stack = merge_lora_stack(parse_lora_stack(lora_stack))
+            for name, strength_model, strength_clip in stack:
+                lora_path = resolve_lora_path(name)
+                if not lora_path: print(f"[Level X] ⚠️ LoRA not found: {name}")
+                resolved.append((name, lora_path, strength_model, strength_clip))
+
+        current_model, current_clip = self.patch_stack(model, clip, [r for r in resolved if r[1]], run)
+
+        with run.stage("trigger_db"):
+            db = get_trigger_index() if auto_trigger else None
+        with run.stage("compose"):
+            entries = [(name, lora_path, i == 0) for i, (name, lora_path, _, _) in enumerate(resolved)] if auto_trigger else []
+            final_prompt, triggers_added = self.compose_prompt(prompt, entries, db)
+        return (current_model, current_clip, final_prompt, triggers_added, run.finish())
+
+# ==============================================================================
+#  VARIANT 8: TRIGGER INJECTOR (prompt batches, no model patching)
+# ==============================================================================
+class LevelX_TriggerInjector(LevelX_BaseAutoLoRA):
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("final_prompts", "triggers_added")
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = "inject_triggers"
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "prompts": ("STRING", {"multiline": True, "default": ""}),
+                "lora_stack": ("STRING", {"multiline": True, "default": "# name:model_strength:clip_strength\n"}),
+            }
         }
 
+    def inject_triggers(self, prompts, lora_stack):
+        # INPUT_IS_LIST: every input arrives as a list, the stack is taken from its first item
+        stack = merge_lora_stack(parse_lora_stack(lora_stack[0]))
+        entries = [(name, resolve_lora_path(name), i == 0) for i, (name, _, _) in enumerate(stack)]
+        return self.compose_prompts(prompts, entries, get_trigger_index())
+
+# ==============================================================================
+#  NODE 8: STACK BAKER (fuse a stack into one LoRA bundle)
+# ==============================================================================
+# (down suffix, up suffix) pairs of the low-rank formats that can be concatenated
+LOW_RANK_SUFFIXES = (
+    (".lora_down.weight", ".lora_up.weight"),
+    (".lora_A.weight", ".lora_B.weight"),
+    (".lora.down.weight", ".lora.up.weight"),
+)
+# Plain weight deltas that are simply summed
+DIFF_SUFFIXES = (".diff", ".diff_b")
+
+def bake_lora_stack(loras):
+    """Fuses [(state_dict, strength_model, strength_clip), ...] into one LoRA state dict.
+
+    Low-rank pairs targeting the same module are concatenated along the rank
+    dimension with each strength * alpha / rank folded into the up matrix, so
+    up_cat @ down_cat equals the sum of the individual deltas exactly. The
+    fused alpha equals the fused rank, giving a scale of 1.0 at strength 1.0.
+    Raises ValueError for formats that cannot be fused (LoHa, LoKr, DoRA, ...).
+    """
+    import torch
+    groups = {}
+    diffs = {}
+    for state_dict, strength_model, strength_clip in loras:
+        used = set()
+        for key in state_dict:
+            for down_sfx, up_sfx in LOW_RANK_SUFFIXES:
+                if not key.endswith(down_sfx): continue
+                base = key[:-len(down_sfx)]
+                up_key = base + up_sfx
+                if up_key not in state_dict: continue
+                down, up = state_dict[key], state_dict[up_key]
+                rank = down.shape[0]
+                alpha_t = state_dict.get(base + ".alpha")
+                scale = (float(alpha_t) / rank) if alpha_t is not None else 1.0
+                strength = strength_clip if is_text_encoder_key(key) else strength_model
+                used.update((key, up_key, base + ".alpha"))
+                if strength == 0: continue  # Side switched off: nothing to carry over
+                groups.setdefault((base, down_sfx, up_sfx), []).append((down, up, strength * scale))
+        for key, value in state_dict.items():
+            if key in used: continue
+            if key.endswith(DIFF_SUFFIXES):
+                strength = strength_clip if is_text_encoder_key(key) else strength_model
+                delta = value.float() * strength
+                diffs[key] = diffs[key] + delta if key in diffs else delta
+                continue
+            raise ValueError(f"[Level X] Cannot bake key {key!r}: only LoRA (down/up) and diff weights can be fused")
+
+    fused = {}
+    for (base, down_sfx, up_sfx), parts in groups.items():
+        dtype = parts[0][1].dtype
+        downs = [d.float() for d, _, _ in parts]
+        ups = [u.float() * factor for _, u, factor in parts]
+        fused[base + down_sfx] = torch.cat(downs, dim=0).to(dtype).contiguous()
+        fused[base + up_sfx] = torch.cat(ups, dim=1).to(dtype).contiguous()
+        fused[base + ".alpha"] = torch.tensor(float(fused[base + down_sfx].shape[0]))
+    for key, delta in diffs.items():
+        fused[key] = delta.contiguous()
+    return fused
+
+def _low_rank_delta(down, up, scale):
+    # Conv LoRAs are 4D: flatten to (out, rank) @ (rank, in * k * k)
+    return (up.float().flatten(1) @ down.float().flatten(1)) * scale
+
+def check_baked_stack(loras, fused, samples=8):
+    """Spot-checks that bake_lora_stack is exact. Raises ValueError on a mismatch.
+
+    For up to `samples` fused modules, up @ down * alpha / rank must equal the
+    sum of strength * alpha_i / rank_i * up_i @ down_i over the stack, within
+    the rounding of the stored dtype.
+    """
+    import torch
+    bases = sorted({(key[:-len(down_sfx)], down_sfx, up_sfx) for key in fused
+                    for down_sfx, up_sfx in LOW_RANK_SUFFIXES if key.endswith(down_sfx)})
+    for base, down_sfx, up_sfx in bases[::max(1, len(bases) // samples)][:samples]:
+        expected = None
+        for state_dict, strength_model, strength_clip in loras:
+            down, up = state_dict.get(base + down_sfx), state_dict.get(base + up_sfx)
+            if down is None or up is None: continue
+            alpha_t = state_dict.get(base + ".alpha")
+            scale = (float(alpha_t) / down.shape[0]) if alpha_t is not None else 1.0
+            strength = strength_clip if is_text_encoder_key(base + down_sfx) else strength_model
+            delta = _low_rank_delta(down, up, strength * scale)
+            expected = delta if expected is None else expected + delta
+        down, up = fused[base + down_sfx], fused[base + up_sfx]
+        actual = _low_rank_delta(down, up, float(fused[base + ".alpha"]) / down.shape[0])
+        tolerance = 1e-4 if up.dtype == torch.float32 else 2e-2
+        error = float((actual - expected).abs().max()) / max(float(expected.abs().max()), 1e-12)
+        if error > tolerance:
+            raise ValueError(f"[Level X] Fused weights of {base} differ from the stack (relative error {error:.2e})")
+
+class LevelX_StackBaker:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "lora_stack": ("STRING", {"multiline": True, "default": "# name:model_strength:clip_strength\n"}),
+                "bundle_name": ("STRING", {"multiline": False, "default": "Bundles/my_stack"}),
+                "overwrite": ("BOOLEAN", {"default": False}),
+            }
+        }
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("status_report",)
+    FUNCTION = "bake_stack"
+    CATEGORY = "Level X/Utils"
+    OUTPUT_NODE = True
+
+    def bake_stack(self, lora_stack, bundle_name, overwrite):
+        stack = merge_lora_stack(parse_lora_stack(lora_stack))
+        if not stack: return ("Bake skipped: the stack is empty",)
+
+        rel_path = bundle_name.replace("\\", "/").strip().strip("/")
+        # The bundle must stay inside the lora folder: no "..", "." or empty path segments
+        if not rel_path or any(seg in ("", ".", "..") for seg in rel_path.split("/")):
+            return (f"Bake failed: invalid bundle name {bundle_name!r}",)
+        if not rel_path.endswith(".safetensors"): rel_path += ".safetensors"
+        lora_root = os.path.abspath(folder_paths.get_folder_paths("loras")[0])
+        out_path = os.path.abspath(os.path.join(lora_root, *rel_path.split("/")))
+        try:
+            inside = os.path.commonpath([lora_root, out_path]) == lora_root
+        except ValueError:
+            inside = False  # Windows: a drive-qualified name (e.g. "C:/x") lands on another drive
+        if not inside:
+            return (f"Bake failed: invalid bundle name {bundle_name!r}",)
+        if os.path.exists(out_path) and not overwrite:
+            return (f"Bake skipped: {rel_path} already exists (enable overwrite)",)
+
+        loras = []
+        for name, strength_model, strength_clip in stack:
+            lora_path = resolve_lora_path(name)
+            if not lora_path: return (f"Bake failed: LoRA not found: {name}",)
+            loras.append((LORA_CACHE.load(lora_path), strength_model, strength_clip, name, lora_path))
+
+        weights = [(sd, sm, sc) for sd, sm, sc, _, _ in loras]
+        try:
+            fused = bake_lora_stack(weights)
+            check_baked_stack(weights, fused)
+        except (ValueError, RuntimeError) as e:
+            # RuntimeError: torch rejects LoRAs whose shapes do not line up (e.g. different base models)
+            return (f"Bake failed: {e}",)
+
+        # Combined trigger list in stack order, each trigger once
+        loader = LevelX_BaseAutoLoRA()
+        db = get_trigger_index()
+        triggers = [loader.get_trigger(name, db, path) for _, _, _, name, path in loras]
+        combined = ", ".join(dict.fromkeys(t for t in triggers if t))
+
+        metadata = {
+            "levelx.bundle": json.dumps([[name, sm, sc] for _, sm, sc, name, _ in loras]),
+            "levelx.bundle_mode": "rank_concat",
+        }
+        if combined: metadata["modelspec.trigger_phrase"] = combined
+
+        from safetensors.torch import save_file
+        try:
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            # The temp file is removed if saving fails, so nothing half-written is left in the loras folder
+            with atomic_path(out_path) as tmp_path:
+                save_file(fused, tmp_path, metadata=metadata)
+        except Exception as e:
+            return (f"Bake failed: could not write {rel_path}: {e}",)
+        if combined: set_triggers({rel_path: combined})
+
+        print(f"[Level X] 🧩 Baked {len(loras)} LoRAs into {rel_path}")
+        return (f"Baked {len(loras)} LoRAs into {rel_path} (triggers: {combined or 'none'})",)
+
+# ==============================================================================
+#  SCAN MANIFEST (incremental local scans)
+# ==============================================================================
+LORA_EXTENSIONS = (".safetensors", ".ckpt")
+SIDECAR_SUFFIXES = (".civitai.info", ".txt")
+
+class ScanManifest:
+    """Persisted record of the last local scan, stored next to lora_trigger.json.
+
+    dirs:    {abs_dir: {"mtime", "subdirs", "loras": {name: sig}}}
+    results: {abs_path: {"sig", "trigger"}}, trigger None meaning "none found"
+
+    A file's sig is [size, mtime, civitai.info mtime, txt mtime]. A directory
+    whose mtime is unchanged is not listed again, so files and sidecars that
+    are edited in place (not added, removed or replaced) need a FORCE RE-SCAN.
+    """
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.dirs = {}
+        self.results = {}
+        self.dirty = False
+        # (mtime, size) of the file as last read or written by this instance
+        self.sig = None
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        manifest.sig = _db_signature(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                manifest.dirs = data.get("dirs", {})
+                manifest.results = data.get("results", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Level X] ⚠️ Ignoring unreadable scan manifest: {e}")
+        return manifest
+
+    def save(self):
+        if not self.dirty: return
+        try:
+            write_json_atomic(self.path, {"version": self.VERSION, "dirs": self.dirs, "results": self.results})
+            self.sig = _db_signature(self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"[Level X] ⚠️ Could not save scan manifest: {e}")
+
+    def reset(self):
+        """Forgets every listing and result, so the next scan lists and extracts everything again."""
+        self.dirs, self.results, self.dirty = {}, {}, True
+
+    def list_dir(self, dir_path):
+        """Returns (subdirs, {lora_name: sig}), listing the directory only if its mtime changed."""
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return [], {}
+        cached = self.dirs.get(dir_path)
+        if cached and cached["mtime"] == mtime:
+            return cached["subdirs"], cached["loras"]
+
+        subdirs, entries = [], {}
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(): subdirs.append(entry.name)
+                    else: entries[entry.name] = entry
+                except OSError:
+                    continue
+
+        loras = {}
+        for name in sorted(entries):
+            if not name.endswith(LORA_EXTENSIONS): continue
+            stem = os.path.splitext(name)[0]
+            try:
+                st = entries[name].stat()
+                sig = [st.st_size, st.st_mtime_ns]
+                for suffix in SIDECAR_SUFFIXES:
+                    side = entries.get(stem + suffix)
+                    sig.append(side.stat().st_mtime_ns if side else None)
+            except OSError:
+                continue
+            loras[name] = sig
+
+        self.dirs[dir_path] = {"mtime": mtime, "subdirs": sorted(subdirs), "loras": loras}
+        self.dirty = True
+        return self.dirs[dir_path]["subdirs"], loras
+
+    def get_result(self, full_path, sig):
+        """Returns (hit, trigger) for a file extracted earlier with the same sig."""
+        cached = self.results.get(full_path)
+        if cached and cached["sig"] == sig:
+            return True, cached["trigger"]
+        return False, None
+
+    def set_result(self, full_path, sig, trigger):
+        self.results[full_path] = {"sig": sig, "trigger": trigger}
+        self.dirty = True
+
+    def update_sig(self, full_path, sig):
+        """Records a file's newer sig in its cached listing (the directory mtime did not change)."""
+        cached = self.dirs.get(os.path.dirname(full_path))
+        name = os.path.basename(full_path)
+        if cached and name in cached["loras"] and cached["loras"][name] != sig:
+            cached["loras"][name] = sig
+            self.dirty = True
+
+    def prune(self, live_dirs, live_files):
+        """Drops entries for directories and files that no longer exist."""
+        dirs = {k: v for k, v in self.dirs.items() if k in live_dirs}
+        results = {k: v for k, v in self.results.items() if k in live_files}
+        if len(dirs) != len(self.dirs) or len(results) != len(self.results):
+            self.dirs, self.results, self.dirty = dirs, results, True
+
+# One manifest per process, shared by the manager's scans and the folder watcher.
+# Hold MANIFEST_LOCK for as long as the manifest is read or modified.
+MANIFEST_LOCK = threading.RLock()
+_MANIFEST = {"manifest": None}
+
+def get_scan_manifest():
+    """The shared ScanManifest. Re-read if another process rewrote the file and no local edits are pending."""
+    path = get_manifest_path()
+    manifest = _MANIFEST["manifest"]
+    if manifest is None or manifest.path != path or (not manifest.dirty and manifest.sig != _db_signature(path)):
+        manifest = _MANIFEST["manifest"] = ScanManifest.load(path)
+    return manifest
+
 # ==============================================================================
 #  NODE 7: TRIGGER MANAGER (Scan & Save)
 # ==============================================================================
@@ -258,13 +1261,18 @@ class LevelX_TriggerSaver:
     def INPUT_TYPES(s):
         return {
             "required": {
-                "operation": (["Save Single Entry", "SCAN LOCAL (Fast)", "SCAN ONLINE (Slow/Deep)"],),
+                "operation": (["Save Single Entry", "SCAN LOCAL (Fast)", "SCAN ONLINE (Slow/Deep)", "FORCE RE-SCAN", "BUILD HASH INDEX", "EXPORT DB TO JSON", "WARM CACHE"],),
                 "lora_name": (folder_paths.get_filename_list("loras"), ),
                 "trigger_word": ("STRING", {"multiline": False, "default": ""}),
+            },
+            "optional": {
+                "scan_workers": ("INT", {"default": 8, "min": 1, "max": 64}),
+                # WARM CACHE: workflow JSON path or one LoRA per line; empty = the pending queue
+                "warm_source": ("STRING", {"multiline": True, "default": ""}),
             }
         }
-    RETURN_TYPES = ("STRING",)
-    RETURN_NAMES = ("status_report",)
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("status_report", "metrics_json")
     FUNCTION = "manage_triggers"
     CATEGORY = "Level X/Utils"
     OUTPUT_NODE = True
@@ -297,98 +1305,208 @@ class LevelX_TriggerSaver:
 
     # --- ENGINE 3: Internal Metadata ---
     def scan_safetensors_meta(self, file_path):
+        if not file_path.endswith(".safetensors"): return None  # .ckpt has no JSON header
         try:
-            with safe_open(file_path, framework="pt", device="cpu") as f:
-                meta = f.metadata()
-                if not meta: return None
-                
-                # A. ModelSpec Standard
-                if "modelspec.trigger_phrase" in meta:
-                    return meta["modelspec.trigger_phrase"]
-                
-                # B. Kohya Frequency
-                if "ss_tag_frequency" in meta:
-                    tags_json = json.loads(meta["ss_tag_frequency"])
-                    all_tags = []
-                    for ds, tags in tags_json.items():
-                        sorted_tags = sorted(tags.items(), key=lambda item: item[1], reverse=True)
-                        if sorted_tags: all_tags.append(sorted_tags[0][0])
-                    if all_tags: return ", ".join(list(set(all_tags)))
+            meta = read_safetensors_metadata(file_path)
+            if not meta: return None
+
+            # A. ModelSpec Standard
+            if "modelspec.trigger_phrase" in meta:
+                return meta["modelspec.trigger_phrase"]
+
+            # B. Kohya Frequency
+            if "ss_tag_frequency" in meta:
+                tags_json = json.loads(meta["ss_tag_frequency"])
+                all_tags = []
+                for ds, tags in tags_json.items():
+                    sorted_tags = sorted(tags.items(), key=lambda item: item[1], reverse=True)
+                    if sorted_tags: all_tags.append(sorted_tags[0][0])
+                if all_tags: return ", ".join(dict.fromkeys(all_tags))
         except Exception as e:
             print(f"[Level X] scan_safetensors_meta failed for {file_path}: {e}")
         return None
 
-    # --- ENGINE 4: Online Search (Civitai API) ---
-    def scan_online_civitai(self, filename):
-        try:
-            query = os.path.splitext(filename)[0].replace("_", " ").replace("-", " ")
-            encoded = urllib.parse.quote(query)
-            url = f"https://civitai.com/api/v1/models?query={encoded}&limit=1"
-            
-            req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req) as r:
-                data = json.loads(r.read().decode())
-                if "items" in data and len(data["items"]) > 0:
-                    model = data["items"][0]
-                    for version in model.get("modelVersions", []):
-                        if version.get("trainedWords"):
-                            return ", ".join(version["trainedWords"])
-        except Exception as e:
-            print(f"[Level X] Online Search Failed for {filename}: {e}")
+    # --- LOCAL PIPELINE: Engines 1-3 for one file ---
+    def extract_local(self, full_path, sig=None, run=NULL_RUN):
+        # sig (from the manifest) tells which sidecars exist, so absent ones are not probed
+        base_path = os.path.splitext(full_path)[0]
+        has_info = sig is None or sig[2] is not None
+        has_txt = sig is None or sig[3] is not None
+        for engine, enabled, source in (
+            ("civitai_info", has_info, base_path),
+            ("safetensors_meta", True, full_path),
+            ("txt_sidecar", has_txt, base_path),
+        ):
+            if not enabled: continue
+            found = getattr(self, "scan_" + engine)(source)
+            if found:
+                run.count("engine_" + engine)
+                return found
+        run.count("engine_none")
         return None
 
-    def manage_triggers(self, operation, lora_name, trigger_word):
-        db = load_db()
-        
+    def collect_lora_files(self, manifest):
+        """Lists (rel_path, full_path, sig) for every LoRA across all configured lora roots.
+
+        Roots are visited in folder_paths order and each tree is walked in sorted
+        order, so results are deterministic. When the same relative path exists
+        under several roots the first root wins, matching folder_paths.get_full_path.
+        """
+        seen = set()
+        found = []
+        live_dirs = set()
+        visited = set()
+        for lora_root in folder_paths.get_folder_paths("loras"):
+            if not os.path.isdir(lora_root): continue
+            stack = [os.path.abspath(lora_root)]
+            while stack:
+                dir_path = stack.pop()
+                real = os.path.realpath(dir_path)
+                if real in visited: continue  # Symlink loop
+                visited.add(real)
+                live_dirs.add(dir_path)
+
+                subdirs, loras = manifest.list_dir(dir_path)
+                rel_dir = os.path.relpath(dir_path, lora_root).replace("\\", "/")
+                rel_prefix = "" if rel_dir == "." else rel_dir + "/"
+                for name, sig in loras.items():
+                    full_path = os.path.join(dir_path, name)
+                    rel_path = rel_prefix + name
+                    if rel_path in seen: continue
+                    seen.add(rel_path)
+                    found.append((rel_path, full_path, sig))
+                # Reversed so the stack pops subdirectories in sorted order
+                stack.extend(os.path.join(dir_path, d) for d in reversed(subdirs))
+        manifest.prune(live_dirs, {full for _, full, _ in found})
+        return found
+
+    def manage_triggers(self, operation, lora_name, trigger_word, scan_workers=8, warm_source=""):
+        run = start_run("manager")
+        status = self.run_operation(operation, lora_name, trigger_word, scan_workers, run, warm_source)
+        return (status, run.finish())
+
+    def run_operation(self, operation, lora_name, trigger_word, scan_workers=8, run=NULL_RUN, warm_source=""):
         # --- MODE A: SAVE SINGLE ---
         if operation == "Save Single Entry":
             clean_name = lora_name.replace("\\", "/").strip()
-            db[clean_name] = trigger_word
-            save_db(db)
-            return (f"Saved: {clean_name}",)
+            with run.stage("save"):
+                set_triggers({clean_name: trigger_word})
+            return f"Saved: {clean_name}"
+
+        # --- MODE E: CONTENT HASH INDEX ---
+        if operation == "BUILD HASH INDEX":
+            started = time.perf_counter()
+            with run.stage("collect"), MANIFEST_LOCK:
+                manifest = get_scan_manifest()
+                all_files = self.collect_lora_files(manifest)
+                manifest.save()
+            with run.stage("hash"):
+                hashed = HASH_INDEX.build([(rel, full) for rel, full, _ in all_files], scan_workers)
+            run.count("files_checked", len(all_files))
+            run.count("files_hashed", hashed)
+            if get_storage_backend() == "sqlite":
+                with run.stage("save"):
+                    files = HASH_INDEX.files
+                    get_sqlite_store().set_hashes({
+                        rel: files[os.path.abspath(full)][2] for rel, full, _ in all_files if os.path.abspath(full) in files
+                    })
+            elapsed = time.perf_counter() - started
+            return f"Hash Index Complete: {len(all_files)} LoRAs, hashed {hashed} new/changed in {elapsed:.2f}s"
 
-        # --- MODE B & C: SCANNING ---
+        # --- MODE F: EXPORT (SQLite -> JSON) ---
+        if operation == "EXPORT DB TO JSON":
+            if get_storage_backend() != "sqlite":
+                return "Export skipped: the trigger DB is already stored as JSON"
+            with run.stage("save"):
+                count = get_sqlite_store().export_json(get_db_path())
+            return f"Exported {count} triggers to {get_db_path()}"
+
+        # --- MODE G: WARM CACHE (pre-warm a worker before it takes jobs) ---
+        if operation == "WARM CACHE":
+            from .prefetch import collect_warm_names, get_prefetcher
+            started = time.perf_counter()
+            try:
+                names = collect_warm_names(warm_source)
+            except (OSError, ValueError) as e:
+                return f"Warm cache failed: {e}"
+            with run.stage("warm"):
+                prefetcher = get_prefetcher()
+                stats = prefetcher.warm(names)
+            for key in ("scheduled", "warm", "missing", "over_budget"): run.count("warm_" + key, stats[key])
+            elapsed = time.perf_counter() - started
+            return (f"Warm Cache ({prefetcher.mode}): read {stats['scheduled']} LoRAs ({stats['bytes'] / 2**20:.0f} MB) "
+                    f"in {elapsed:.2f}s, {stats['warm']} already warm, {stats['missing']} not found, "
+                    f"{stats['over_budget']} over budget")
+
+        # --- MODE B, C & D: SCANNING ---
         is_online = (operation == "SCAN ONLINE (Slow/Deep)")
-        lora_root = folder_paths.get_folder_paths("loras")[0]
-        
-        count_new = 0
-        count_checked = 0
+        is_forced = (operation == "FORCE RE-SCAN")
+        with run.stage("load_db"):
+            db = load_db()
+        new_entries = {}
         
-        print(f"[Level X] 🚀 Starting Scan (Online: {is_online})...")
-
-        for root, dirs, files in os.walk(lora_root):
-            for file in files:
-                if file.endswith(".safetensors") or file.endswith(".ckpt"):
-                    count_checked += 1
-                    full_path = os.path.join(root, file)
-                    base_path = os.path.splitext(full_path)[0]
-                    rel_path = os.path.relpath(full_path, lora_root).replace("\\", "/")
-                    
-                    # Only check if missing
-                    if rel_path not in db or not db[rel_path]:
-                        found = None
-                        
-                        # 1. Local Civitai Info
-                        if not found: found = self.scan_civitai_info(base_path)
-                        # 2. Local Metadata
-                        if not found: found = self.scan_safetensors_meta(full_path)
-                        # 3. Local Txt
-                        if not found: found = self.scan_txt_sidecar(base_path)
-                        
-                        # 4. Online Search (Only if requested)
-                        if not found and is_online:
-                            print(f"   -> ☁️ Searching online for: {file}")
-                            found = self.scan_online_civitai(file)
-
-                        if found:
-                            db[rel_path] = found
-                            count_new += 1
-                            print(f"   -> ✅ Found: {rel_path} = {found}")
-
-        if count_new > 0:
-            save_db(db)
-            msg = f"Scan Complete: Added {count_new} triggers [Online: {is_online}]"
+        print(f"[Level X] 🚀 Starting Scan (Online: {is_online}, Forced: {is_forced}, Workers: {scan_workers})...")
+        started = time.perf_counter()
+
+        # A forced scan starts from an empty manifest, so every directory is listed again
+        with run.stage("collect"), MANIFEST_LOCK:
+            manifest = get_scan_manifest()
+            if is_forced: manifest.reset()
+            all_files = self.collect_lora_files(manifest)
+            # Only check if missing, and skip files whose extraction result is still valid
+            results = {}
+            to_extract = []
+            for rel_path, full_path, sig in all_files:
+                if rel_path in db and db[rel_path]: continue
+                hit, trigger = manifest.get_result(full_path, sig)
+                if hit: results[rel_path] = trigger
+                else: to_extract.append((rel_path, full_path, sig))
+        count_checked = len(all_files)
+        run.count("files_checked", count_checked)
+        run.count("manifest_hits", len(results))
+
+        # 1-3. Local engines, one file per worker. map() keeps submission order.
+        with run.stage("local_extract"), ThreadPoolExecutor(max_workers=max(1, int(scan_workers))) as pool:
+            extracted = list(pool.map(lambda item: self.extract_local(item[1], item[2], run), to_extract))
+        with MANIFEST_LOCK:
+            for (rel_path, full_path, sig), found in zip(to_extract, extracted):
+                manifest.set_result(full_path, sig, found or None)
+                results[rel_path] = found
+
+        # 4. Online Search (Only if requested), concurrent and cached
+        online = {}
+        if is_online:
+            missing = [full for rel, full, _ in all_files if rel in results and not results[rel]]
+            if missing:
+                print(f"   -> ☁️ Searching online for {len(missing)} LoRAs...")
+                # Files already in the hash index are looked up by hash instead of fuzzy text search
+                from .civitai_lookup import CivitaiLookup
+                with run.stage("online"):
+                    hashes = {full: HASH_INDEX.hash_for(full) for full in missing}
+                    online = CivitaiLookup(run=run).search_many(missing, hashes)
+                found_online = sum(1 for trigger in online.values() if trigger)
+                run.count("online_found", found_online)
+                run.count("online_missing", len(online) - found_online)
+
+        for rel_path, full_path, sig in all_files:
+            if rel_path not in results: continue
+            found = results[rel_path] or online.get(full_path)
+
+            if found:
+                new_entries[rel_path] = found
+                print(f"   -> ✅ Found: {rel_path} = {found}")
+
+        with run.stage("save"):
+            with MANIFEST_LOCK:
+                manifest.save()
+            if new_entries: set_triggers(new_entries)
+        elapsed = time.perf_counter() - started
+        rate = count_checked / elapsed if elapsed > 0 else 0.0
+        speed = f"Checked {count_checked}, extracted {len(to_extract)} in {elapsed:.2f}s, {rate:.0f} files/sec"
+
+        if new_entries:
+            msg = f"Scan Complete: Added {len(new_entries)} triggers [Online: {is_online}] ({speed})"
         else:
-            msg = f"Scan Complete: No new triggers found. (Checked {count_checked})"
+            msg = f"Scan Complete: No new triggers found. ({speed})"
         
-        return (msg,)
\ No newline at end of file
+        return msg
\ No newline at end of file
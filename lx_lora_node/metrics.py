@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+
+from .fileio import atomic_path
+
+# ==============================================================================
+#  METRICS (opt-in with LEVELX_METRICS=1)
+# ==============================================================================
+logger = logging.getLogger("levelx")
+
+ENABLED = os.environ.get("LEVELX_METRICS", "").strip().lower() in ("1", "true", "yes", "on")
+# Optional Prometheus textfile (node_exporter textfile collector), rewritten after every run
+TEXTFILE_PATH = os.environ.get("LEVELX_METRICS_TEXTFILE", "")
+
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsRegistry:
+    """Process-wide cumulative counters and histograms, rendered in Prometheus text format."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, seconds):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {"buckets": [0] * len(HISTOGRAM_BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if seconds <= bound: hist["buckets"][i] += 1
+            hist["sum"] += seconds
+            hist["count"] += 1
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, dict(v, buckets=list(v["buckets"]))) for k, v in self.histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f"{name}{{{label_str}}} {value}")
+        for (name, labels), hist in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            base = [f'{k}="{_escape(v)}"' for k, v in labels]
+            bounds = [str(b) for b in HISTOGRAM_BUCKETS] + ["+Inf"]
+            for bound, count in zip(bounds, hist["buckets"] + [hist["count"]]):
+                label_str = ",".join(base + [f'le="{bound}"'])
+                lines.append(f"{name}_bucket{{{label_str}}} {count}")
+            label_str = ",".join(base)
+            lines.append(f"{name}_sum{{{label_str}}} {hist['sum']:.6f}")
+            lines.append(f"{name}_count{{{label_str}}} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        try:
+            with atomic_path(path) as tmp_path:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self.render())
+        except Exception as e:
+            logger.warning("Could not write metrics textfile %s: %s", path, e)
+
+REGISTRY = MetricsRegistry()
+
+class RunMetrics:
+    """Stage timings and counters of one node execution (a loader run or a manager operation)."""
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            REGISTRY.observe("levelx_stage_seconds", {"kind": self.kind, "stage": name}, elapsed)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        REGISTRY.inc("levelx_events_total", {"kind": self.kind, "event": name}, amount)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+        REGISTRY.observe("levelx_latency_seconds", {"kind": self.kind, "name": name}, seconds)
+
+    def summary(self):
+        with self._lock:
+            latencies = {
+                name: {"count": len(v), "avg_ms": round(sum(v) / len(v) * 1000, 3), "max_ms": round(max(v) * 1000, 3)}
+                for name, v in self.latencies.items() if v
+            }
+            return {
+                "kind": self.kind,
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                "stages_ms": {k: round(v * 1000, 3) for k, v in self.stages.items()},
+                "counters": dict(self.counters),
+                "latency": latencies,
+            }
+
+    def finish(self):
+        """Logs the run, refreshes the textfile and returns the summary as a JSON string."""
+        summary = self.summary()
+        REGISTRY.observe("levelx_run_seconds", {"kind": self.kind}, summary["total_ms"] / 1000)
+        logger.info("[Level X] %s timings: %s", self.kind, json.dumps(summary))
+        if TEXTFILE_PATH: REGISTRY.write_textfile(TEXTFILE_PATH)
+        return json.dumps(summary)
+
+class _NullRun:
+    """Stand-in used while metrics are disabled: every call is a no-op."""
+    _null_stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._null_stage
+
+    def count(self, name, amount=1):
+        pass
+
+    def observe(self, name, seconds):
+        pass
+
+    def finish(self):
+        return "{}"
+
+NULL_RUN = _NullRun()
+
+def start_run(kind):
+    return RunMetrics(kind) if ENABLED else NULL_RUN
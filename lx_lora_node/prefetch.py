@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .lx_lora_node import (
+    LORA_CACHE, LORA_EXTENSIONS, LoraStateCache, _env_int, lora_part, parse_lora_stack, resolve_lora_path,
+)
+
+# ==============================================================================
+#  LORA PREFETCH (warm the page cache or LORA_CACHE ahead of the loaders)
+# ==============================================================================
+PREFETCH_CHUNK_SIZE = 8 * 1024 * 1024
+LORA_NAME_INPUT = re.compile(r"^lora_(\d+)_name$")
+
+def _part(strength_model, strength_clip):
+    # Linked strengths are unknown ahead of time, so the whole file is warmed
+    if not all(isinstance(s, (int, float)) for s in (strength_model, strength_clip)): return "all"
+    return lora_part(strength_model, strength_clip)
+
+def _skipped(strength_model, strength_clip):
+    # The loaders ignore entries whose strengths are both 0
+    return strength_model == 0 and strength_clip == 0
+
+def merge_parts(target, parts):
+    """Adds a {name: [part, ...]} mapping into target without duplicate parts."""
+    for name, wanted in parts.items():
+        have = target.setdefault(name, [])
+        have.extend(p for p in wanted if p not in have)
+    return target
+
+def extract_lora_parts(workflow):
+    """Returns {name: [part, ...]} for the LoRAs used by Level X nodes in a workflow, in order.
+
+    The parts are the halves of the file the loaders will read ("model", "clip"
+    or "all", see lora_part). Accepts the API format ({id: {"class_type",
+    "inputs"}}), the UI format ({"nodes": [...]}) and ComfyUI queue items (whose
+    third field is the prompt).
+    """
+    found = []
+    if isinstance(workflow, (list, tuple)):
+        # Queue item: (number, prompt_id, prompt, extra_data, outputs_to_execute)
+        if len(workflow) > 2 and isinstance(workflow[2], dict): workflow = workflow[2]
+        else: return {}
+    if not isinstance(workflow, dict): return {}
+
+    if isinstance(workflow.get("nodes"), list):
+        # UI format: widget values are positional, so keep every LoRA file name a Level X node holds
+        for node in workflow["nodes"]:
+            if not str(node.get("type", "")).startswith("LevelX_"): continue
+            for value in node.get("widgets_values") or []:
+                if isinstance(value, str) and value.lower().endswith(LORA_EXTENSIONS): found.append((value, "all"))
+                elif node.get("type") == "LevelX_LoRAStack" and isinstance(value, str):
+                    found.extend(_stack_parts(value))
+    else:
+        for node in workflow.values():
+            if not isinstance(node, dict) or not str(node.get("class_type", "")).startswith("LevelX_"): continue
+            inputs = node.get("inputs") or {}
+            separate = inputs.get("separate_clip_strength", False)
+            for key, value in inputs.items():
+                match = LORA_NAME_INPUT.match(key)
+                # Linked inputs are [node_id, slot] lists and cannot be resolved ahead of time
+                if not match or not isinstance(value, str): continue
+                strength_model = inputs.get(f"lora_{match.group(1)}_strength", 1.0)
+                if separate is False: strength_clip = strength_model
+                elif separate is True: strength_clip = inputs.get(f"lora_{match.group(1)}_clip_strength", 1.0)
+                else: strength_clip = None
+                if not _skipped(strength_model, strength_clip): found.append((value, _part(strength_model, strength_clip)))
+            if isinstance(inputs.get("lora_stack"), str): found.extend(_stack_parts(inputs["lora_stack"]))
+    parts = {}
+    for name, part in found:
+        if name and name != "None": merge_parts(parts, {name: [part]})
+    return parts
+
+def extract_lora_names(workflow):
+    """Returns the LoRA names used by Level X nodes in a workflow, in order, without duplicates."""
+    return list(extract_lora_parts(workflow))
+
+def _stack_parts(text):
+    try:
+        return [(name, _part(sm, sc)) for name, sm, sc in parse_lora_stack(text) if not _skipped(sm, sc)]
+    except ValueError:
+        return []
+
+def load_workflow_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def pending_queue_items():
+    """(prompt_id, prompt) of every prompt waiting in ComfyUI's queue (empty outside a running server).
+
+    get_current_queue() deep-copies the whole queue under its lock, so the
+    shallow get_current_queue_volatile() is used where ComfyUI has it. The
+    prompts are only read, never modified.
+    """
+    try:
+        from server import PromptServer
+        queue = PromptServer.instance.prompt_queue
+        get_queue = getattr(queue, "get_current_queue_volatile", None) or queue.get_current_queue
+        running, pending = get_queue()
+    except Exception:
+        return []
+    return [(item[1], item[2]) for item in pending if len(item) > 2]
+
+def queue_lora_parts():
+    parts = {}
+    for _, workflow in pending_queue_items():
+        merge_parts(parts, extract_lora_parts(workflow))
+    return parts
+
+def read_into_page_cache(path):
+    """Reads a file once so the OS keeps it in its page cache. Returns the bytes read."""
+    buf = bytearray(PREFETCH_CHUNK_SIZE)
+    total = 0
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            n = f.readinto(buf)
+            if not n: break
+            total += n
+    return total
+
+class LoraPrefetcher:
+    """Warms LoRA files on background threads, capped by a byte budget per request.
+
+    mode "page" reads files into the OS page cache (no process memory is kept);
+    mode "tensor" loads the parts the loaders will read into LORA_CACHE, so the
+    loader skips the read entirely. Files are skipped if they are already warm,
+    in flight, or beyond the budget.
+    """
+    def __init__(self, budget_bytes, workers=2, mode="page"):
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.mode = mode if mode in ("page", "tensor") else "page"
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="levelx-prefetch")
+        self._lock = threading.Lock()
+        self._inflight = set()
+        # Versions already read into the page cache (bounded, the OS may drop pages anyway)
+        self._warm = OrderedDict()
+        self._warm_limit = 4096
+        # Queued prompt ids already scanned by prefetch_queue (bounded)
+        self._seen_prompts = OrderedDict()
+        self._seen_limit = 4096
+        self._scanning = False
+
+    def _is_warm(self, key):
+        if self.mode == "tensor": return LORA_CACHE.contains(key)
+        with self._lock:
+            return key in self._warm
+
+    def _warm_one(self, path, key):
+        # key is the LoraStateCache key: (path, mtime, size) plus the part in tensor mode
+        try:
+            if self.mode == "tensor":
+                LORA_CACHE.load(path, key[3])
+            else:
+                read_into_page_cache(path)
+                with self._lock:
+                    self._warm[key] = True
+                    while len(self._warm) > self._warm_limit: self._warm.popitem(last=False)
+        except Exception as e:
+            print(f"[Level X] Prefetch failed for {path}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def submit(self, names):
+        """Schedules LoRAs for warming and returns (futures, stats) without waiting.
+
+        names is a list of names or a {name: [part, ...]} mapping (extract_lora_parts);
+        plain names are warmed whole.
+        """
+        stats = {"requested": 0, "scheduled": 0, "bytes": 0, "warm": 0, "missing": 0, "over_budget": 0}
+        futures = []
+        budget = self.budget_bytes
+        if self.mode == "tensor": budget = min(budget, LORA_CACHE.max_bytes)
+        items = names if isinstance(names, dict) else dict.fromkeys(names, ["all"])
+        for name, parts in items.items():
+            stats["requested"] += 1
+            path = resolve_lora_path(name)
+            if not path:
+                stats["missing"] += 1
+                continue
+            try:
+                file_key = LoraStateCache.make_key(path)
+            except OSError:
+                stats["missing"] += 1
+                continue
+            size = file_key[2]
+            keys = [file_key + (part,) for part in parts] if self.mode == "tensor" else [file_key]
+            with self._lock:
+                keys = [key for key in keys if key not in self._inflight]
+            keys = [key for key in keys if not self._is_warm(key)]
+            if not keys:
+                stats["warm"] += 1
+                continue
+            if stats["bytes"] + size * len(keys) > budget:
+                stats["over_budget"] += 1
+                continue
+            with self._lock:
+                self._inflight.update(keys)
+            stats["scheduled"] += 1
+            stats["bytes"] += size * len(keys)
+            futures.extend(self._pool.submit(self._warm_one, path, key) for key in keys)
+        return futures, stats
+
+    def warm(self, names):
+        """Warms names and waits for the reads to finish. Returns the submit() stats."""
+        futures, stats = self.submit(names)
+        wait(futures)
+        return stats
+
+    def prefetch_queue(self):
+        """Schedules a scan of the pending prompts on the reader threads and returns at once.
+
+        Returns False if a scan is still running. Only prompts that no earlier
+        scan has seen are parsed, so each queued prompt is read once.
+        """
+        with self._lock:
+            if self._scanning: return False
+            self._scanning = True
+        self._pool.submit(self._scan_queue)
+        return True
+
+    def _scan_queue(self):
+        try:
+            parts = {}
+            for prompt_id, workflow in pending_queue_items():
+                with self._lock:
+                    if prompt_id in self._seen_prompts: continue
+                    self._seen_prompts[prompt_id] = True
+                    while len(self._seen_prompts) > self._seen_limit: self._seen_prompts.popitem(last=False)
+                merge_parts(parts, extract_lora_parts(workflow))
+            if parts: self.submit(parts)
+        except Exception as e:
+            print(f"[Level X] Queue prefetch failed: {e}")
+        finally:
+            with self._lock:
+                self._scanning = False
+
+_PREFETCHER = None
+_PREFETCHER_LOCK = threading.Lock()
+
+def get_prefetcher():
+    """Shared prefetcher: LEVELX_PREFETCH_MB budget (default 4096), _WORKERS (2), _MODE (page|tensor)."""
+    global _PREFETCHER
+    with _PREFETCHER_LOCK:
+        if _PREFETCHER is None:
+            _PREFETCHER = LoraPrefetcher(
+                _env_int("LEVELX_PREFETCH_MB", 4096) * 1024 * 1024,
+                _env_int("LEVELX_PREFETCH_WORKERS", 2),
+                os.environ.get("LEVELX_PREFETCH_MODE", "page").strip().lower(),
+            )
+        return _PREFETCHER
+
+def collect_warm_names(source):
+    """{name: [part, ...]} for WARM CACHE: a workflow JSON path, a LoRA stack/list text, or the pending queue."""
+    source = (source or "").strip()
+    if not source: return queue_lora_parts()
+    if source.lower().endswith(".json"):
+        # Relative paths are tried next to this package too (where the example workflows live)
+        for path in (source, os.path.join(os.path.dirname(os.path.abspath(__file__)), source)):
+            if os.path.isfile(path): return extract_lora_parts(load_workflow_file(path))
+        raise FileNotFoundError(f"[Level X] Workflow not found: {source}")
+    parts = {}
+    for name, strength_model, strength_clip in parse_lora_stack(source):
+        if not _skipped(strength_model, strength_clip): merge_parts(parts, {name: [_part(strength_model, strength_clip)]})
+    return parts
@@ -0,0 +1,96 @@
+import os
+import json
+import threading
+
+import folder_paths
+
+from .fileio import write_json_atomic
+
+# ==============================================================================
+#  PYTHONGOSSSSS LORA INFO SETTINGS PATCH (runs in the background after boot)
+# ==============================================================================
+SETTINGS_KEY = "pysssss.ModelInfo.LoraNodesWidgets"
+LX_NODES = [
+    f"{node}.lora_{i}_name"
+    for node in ("LevelX_MultiAutoLoRA", "LevelX_FluxAutoLoRA", "LevelX_SDXLAutoLoRA",
+                 "LevelX_Flux2AutoLoRA", "LevelX_QwenAutoLoRA", "LevelX_ZImageAutoLoRA")
+    for i in (1, 2, 3)
+]
+
+def get_state_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "pysssss_patch_state.json")
+
+def settings_fingerprint(user_dir):
+    """[path, size, mtime] of every profile's comfy.settings.json, plus the node list.
+
+    Only stat() calls: an unchanged fingerprint means there is nothing left to patch.
+    """
+    files = []
+    for profile in sorted(os.listdir(user_dir)):
+        settings_path = os.path.join(user_dir, profile, "comfy.settings.json")
+        try:
+            st = os.stat(settings_path)
+        except OSError:
+            continue
+        files.append([settings_path, st.st_size, st.st_mtime_ns])
+    return {"nodes": LX_NODES, "files": files}
+
+def _read_state():
+    try:
+        with open(get_state_path(), 'r', encoding='utf-8') as f:
+            return json.load(f).get("fingerprint")
+    except Exception:
+        return None
+
+def _write_state(fingerprint):
+    write_json_atomic(get_state_path(), {"fingerprint": fingerprint})
+
+def patch_pysssss_settings():
+    """Silently injects Level X nodes into the Pythongosssss LoRA Info settings."""
+    try:
+        user_dir = os.path.join(folder_paths.base_path, "user")
+        if not os.path.exists(user_dir):
+            return
+
+        fingerprint = settings_fingerprint(user_dir)
+        if fingerprint == _read_state():
+            return
+
+        # Iterate through all ComfyUI user profiles (usually 'default')
+        for profile in os.listdir(user_dir):
+            profile_path = os.path.join(user_dir, profile)
+            if not os.path.isdir(profile_path):
+                continue
+
+            settings_path = os.path.join(profile_path, "comfy.settings.json")
+            if not os.path.exists(settings_path):
+                continue
+
+            with open(settings_path, "r", encoding="utf-8") as f:
+                settings = json.load(f)
+
+            if SETTINGS_KEY in settings:
+                current_val = settings[SETTINGS_KEY]
+                needs_update = False
+
+                for node in LX_NODES:
+                    if node not in current_val:
+                        current_val += f",{node}"
+                        needs_update = True
+
+                if needs_update:
+                    settings[SETTINGS_KEY] = current_val
+                    write_json_atomic(settings_path, settings, indent=4)
+                    print(f"[Level X] ✨ Auto-patched Pythongosssss settings for profile: {profile}")
+
+        # Taken after patching, so our own writes do not trigger another pass next boot
+        _write_state(settings_fingerprint(user_dir))
+
+    except Exception as e:
+        print(f"[Level X] ⚠️ Non-critical: Could not auto-patch Pythongosssss settings: {e}")
+
+def start_background_patch():
+    """Runs patch_pysssss_settings on a daemon thread so node import stays free of file I/O."""
+    thread = threading.Thread(target=patch_pysssss_settings, name="levelx-pysssss-patch", daemon=True)
+    thread.start()
+    return thread
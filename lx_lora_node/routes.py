@@ -0,0 +1,208 @@
+import os
+import json
+import functools
+import threading
+from collections import OrderedDict
+
+import folder_paths
+
+from .hash_index import HASH_INDEX
+from .lx_lora_node import (
+    LevelX_BaseAutoLoRA, get_trigger_db_version, get_trigger_index, read_safetensors_metadata, resolve_lora_path,
+)
+from .metrics import ENABLED, REGISTRY
+
+# ==============================================================================
+#  HTTP ROUTES (registered on ComfyUI's PromptServer when it is running)
+# ==============================================================================
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    PromptServer = None
+
+MAX_BATCH = 5000
+METADATA_KEYS = (
+    "ss_base_model_version", "ss_network_module", "ss_network_dim", "ss_network_alpha",
+    "modelspec.architecture", "modelspec.title", "levelx.bundle",
+)
+
+# --- Batch trigger resolution ---
+@functools.lru_cache(maxsize=4096)
+def _file_metadata(path, mtime_ns, size):
+    # Keyed by file version, so an edited file is read again
+    if not path.endswith(".safetensors"): return {}
+    try:
+        meta = read_safetensors_metadata(path)
+    except (OSError, ValueError):
+        return {}
+    return {k: meta[k] for k in METADATA_KEYS if k in meta}
+
+def _file_version(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def file_metadata(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    return dict(_file_metadata(path, st.st_mtime_ns, st.st_size))
+
+def engine_folder(name):
+    top, sep, _ = (name or "").replace("\\", "/").partition("/")
+    return top if sep else None
+
+_LOADER = LevelX_BaseAutoLoRA()
+
+def resolve_name(name, index, with_metadata=False):
+    """Resolves a name through the loaders' own resolve_lora_path and get_trigger."""
+    path = resolve_lora_path(name)
+    trigger = _LOADER.get_trigger(name, index, path)
+    source = None
+    if trigger: source = "db" if trigger == index.lookup(name) else "hash"
+    sha = HASH_INDEX.hash_for(path) if path else None
+    result = {
+        "query": name, "kind": "name", "found": bool(trigger), "trigger": trigger or None, "source": source,
+        "engine": engine_folder(name), "exists": bool(path),
+        "sha256": sha, "autov2": sha[:10].upper() if sha else None,
+    }
+    if with_metadata: result["metadata"] = file_metadata(path) if path else {}
+    return result
+
+def hash_query_sha(value, autov2_map):
+    """SHA256 for a full hash or an AutoV2 short hash, None if it is not indexed."""
+    query = (value or "").strip().lower()
+    return query if len(query) == 64 else autov2_map.get(query.upper())
+
+def resolve_hash(value, index, autov2_map, with_metadata=False):
+    sha = hash_query_sha(value, autov2_map)
+    trigger = index.lookup_hash(sha) if sha else None
+    paths = HASH_INDEX.paths_for_hash(sha) if sha else []
+    result = {
+        "query": value, "kind": "hash", "found": bool(trigger), "trigger": trigger or None,
+        "source": "hash" if trigger else None, "engine": engine_folder(paths[0]) if paths else None,
+        "paths": paths, "sha256": sha, "autov2": sha[:10].upper() if sha else None,
+    }
+    if with_metadata:
+        path = resolve_lora_path(paths[0]) if paths else None
+        result["metadata"] = file_metadata(path) if path else {}
+    return result
+
+def resolve_triggers(names, hashes, with_metadata=False):
+    """Resolves LoRA names and SHA256/AutoV2 hashes against the loaders' in-memory index."""
+    index = get_trigger_index()
+    results = [resolve_name(name, index, with_metadata) for name in names]
+    if hashes:
+        autov2_map = HASH_INDEX.autov2_map() if any(len(h.strip()) != 64 for h in hashes) else {}
+        results.extend(resolve_hash(h, index, autov2_map, with_metadata) for h in hashes)
+    return {"count": len(results), "found": sum(1 for r in results if r["found"]), "results": results}
+
+def trigger_etag(names, hashes, with_metadata):
+    """Weak validator over everything a response is built from.
+
+    Covers the DB and hash index versions, the LoRA filename list itself (a
+    rename or move keeps its length), the (mtime, size) of every file a result
+    reads (sha256 and metadata depend on it) and the request itself.
+    """
+    import hashlib  # Loaded on the first request, not at node import
+    listing = hashlib.sha1(json.dumps(folder_paths.get_filename_list("loras")).encode()).hexdigest()
+    paths = [resolve_lora_path(name) for name in names]
+    if hashes and with_metadata:
+        autov2_map = HASH_INDEX.autov2_map()
+        for value in hashes:
+            sha = hash_query_sha(value, autov2_map)
+            indexed = HASH_INDEX.paths_for_hash(sha) if sha else []
+            paths.append(resolve_lora_path(indexed[0]) if indexed else None)
+    files = [[path, _file_version(path)] if path else None for path in paths]
+    version = (get_trigger_db_version(), HASH_INDEX.signature(), listing)
+    key = json.dumps([repr(version), files, names, hashes, with_metadata]).encode()
+    return 'W/"' + hashlib.sha1(key).hexdigest()[:24] + '"'
+
+class ResponseCache:
+    """Small LRU of rendered response bodies keyed by ETag."""
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is not None: self._entries.move_to_end(etag)
+            return body
+
+    def put(self, etag, body):
+        with self._lock:
+            self._entries[etag] = body
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+RESPONSE_CACHE = ResponseCache()
+
+def parse_trigger_request(data):
+    """Validates {"names": [...], "hashes": [...], "metadata": bool}. Raises ValueError."""
+    if not isinstance(data, dict): raise ValueError("expected a JSON object")
+    names = data.get("names") or []
+    hashes = data.get("hashes") or []
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        raise ValueError("'names' must be a list of strings")
+    if not isinstance(hashes, list) or not all(isinstance(h, str) for h in hashes):
+        raise ValueError("'hashes' must be a list of strings")
+    if len(names) + len(hashes) > MAX_BATCH:
+        raise ValueError(f"at most {MAX_BATCH} names and hashes per request")
+    return names, hashes, bool(data.get("metadata"))
+
+def build_trigger_response(names, hashes, with_metadata, if_none_match=None):
+    """Returns (status, etag, body). status 304 means the client's copy is current."""
+    etag = trigger_etag(names, hashes, with_metadata)
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return 304, etag, b""
+    body = RESPONSE_CACHE.get(etag)
+    if body is None:
+        body = json.dumps(resolve_triggers(names, hashes, with_metadata)).encode("utf-8")
+        RESPONSE_CACHE.put(etag, body)
+    return 200, etag, body
+
+def register_routes(routes):
+    import asyncio  # Already loaded inside ComfyUI; kept out of standalone imports
+    @routes.get("/levelx/metrics")
+    async def levelx_metrics(request):
+        if not ENABLED:
+            return web.Response(status=404, text="Level X metrics are disabled (set LEVELX_METRICS=1)\n")
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    async def _respond(request, data):
+        try:
+            names, hashes, with_metadata = parse_trigger_request(data)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        # Index lookups and stat() calls stay off the event loop
+        status, etag, body = await asyncio.get_running_loop().run_in_executor(
+            None, build_trigger_response, names, hashes, with_metadata, request.headers.get("If-None-Match")
+        )
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if status == 304: return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    @routes.post("/levelx/triggers")
+    async def levelx_triggers_post(request):
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.json_response({"error": "invalid JSON body"}, status=400)
+        return await _respond(request, data)
+
+    @routes.get("/levelx/triggers")
+    async def levelx_triggers_get(request):
+        query = request.rel_url.query
+        return await _respond(request, {
+            "names": query.getall("name", []), "hashes": query.getall("hash", []),
+            "metadata": query.get("metadata", "").lower() in ("1", "true", "yes"),
+        })
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    register_routes(PromptServer.instance.routes)
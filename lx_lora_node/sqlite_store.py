@@ -0,0 +1,160 @@
+import os
+import json
+import sqlite3
+import threading
+
+from .fileio import write_json_atomic
+from .lx_lora_node import normalize_lora_key
+
+# ==============================================================================
+#  SQLITE TRIGGER STORE (opt-in with LEVELX_TRIGGER_STORE=sqlite)
+# ==============================================================================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS triggers (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    key       TEXT NOT NULL UNIQUE,
+    trigger   TEXT NOT NULL DEFAULT '',
+    norm_full TEXT NOT NULL,
+    leaf      TEXT NOT NULL,
+    sha256    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_triggers_norm_full ON triggers(norm_full);
+CREATE INDEX IF NOT EXISTS idx_triggers_leaf ON triggers(leaf);
+CREATE INDEX IF NOT EXISTS idx_triggers_sha256 ON triggers(sha256);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+UPSERT = """
+INSERT INTO triggers (key, trigger, norm_full, leaf) VALUES (?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET trigger = excluded.trigger
+"""
+
+def get_sqlite_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "lora_trigger.sqlite")
+
+def _row(key, trigger):
+    norm_full = normalize_lora_key(key)
+    return (key, trigger or "", norm_full, norm_full.split("/")[-1])
+
+class SqliteTriggerIndex:
+    """Same lookup interface as TriggerIndex, answered by indexed queries.
+
+    Row ids preserve insertion order, so "first matching key wins" still holds.
+    """
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.conn().execute("SELECT COUNT(*) FROM triggers").fetchone()[0]
+
+    def _first(self, column, value):
+        return self.store.conn().execute(
+            f"SELECT id, trigger FROM triggers WHERE {column} = ? ORDER BY id LIMIT 1", (value,)
+        ).fetchone()
+
+    def lookup(self, lora_name):
+        if not lora_name or lora_name == "None": return None
+        input_full = normalize_lora_key(lora_name)
+        hits = [h for h in (self._first("norm_full", input_full), self._first("leaf", input_full.split("/")[-1])) if h]
+        if not hits: return None
+        return min(hits)[1]
+
+    def lookup_exact(self, lora_name):
+        if not lora_name or lora_name == "None": return None
+        hit = self._first("norm_full", normalize_lora_key(lora_name))
+        return hit[1] if hit else None
+
+    def lookup_hash(self, sha256):
+        row = self.store.conn().execute(
+            "SELECT trigger FROM triggers WHERE sha256 = ? AND trigger != '' ORDER BY id LIMIT 1", (sha256,)
+        ).fetchone()
+        return row[0] if row else None
+
+class SqliteTriggerStore:
+    """WAL-mode SQLite store with single-row upserts; one connection per thread.
+
+    On first open an existing lora_trigger.json is imported once (in file order).
+    """
+    def __init__(self, path=None, json_path=None):
+        self.path = path or get_sqlite_path()
+        self.json_path = json_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+        self.index = SqliteTriggerIndex(self)
+
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._init_lock:
+            if self._ready: return
+            conn.executescript(SCHEMA)
+            migrated = conn.execute("SELECT value FROM meta WHERE name = 'migrated_from_json'").fetchone()
+            if not migrated and self.json_path and os.path.exists(self.json_path):
+                self.migrate_from_json(self.json_path, conn)
+            self._ready = True
+
+    def migrate_from_json(self, json_path, conn=None):
+        conn = conn or self.conn()
+        with open(json_path, 'r', encoding='utf-8') as f:
+            db = json.load(f)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(UPSERT, [_row(k, v) for k, v in db.items()])
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('migrated_from_json', ?)", (json_path,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"[Level X] 📦 Migrated {len(db)} triggers from JSON into SQLite")
+
+    def export_json(self, json_path):
+        db = self.load()
+        write_json_atomic(json_path, db, indent=4)
+        return len(db)
+
+    def load(self):
+        return dict(self.conn().execute("SELECT key, trigger FROM triggers ORDER BY id"))
+
+    def upsert(self, entries):
+        conn = self.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(UPSERT, [_row(k, v) for k, v in entries.items()])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def replace_all(self, db):
+        conn = self.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            keep = set(db)
+            stale = [(k,) for (k,) in conn.execute("SELECT key FROM triggers") if k not in keep]
+            conn.executemany("DELETE FROM triggers WHERE key = ?", stale)
+            conn.executemany(UPSERT, [_row(k, v) for k, v in db.items()])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def set_hashes(self, hashes):
+        """Records {db_key: sha256} for rows that exist."""
+        conn = self.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("UPDATE triggers SET sha256 = ? WHERE key = ?", [(h, k) for k, h in hashes.items()])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
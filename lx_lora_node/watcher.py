@@ -0,0 +1,179 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import folder_paths
+
+from .lx_lora_node import (
+    MANIFEST_LOCK, SIDECAR_SUFFIXES, LevelX_TriggerSaver,
+    _env_int, get_scan_manifest, get_trigger_index, set_triggers,
+)
+from .metrics import start_run
+
+# ==============================================================================
+#  LORA FOLDER WATCHER (opt-in with LEVELX_WATCH=1)
+# ==============================================================================
+def lora_file_sig(full_path):
+    """Same [size, mtime, civitai.info mtime, txt mtime] signature the scan manifest stores."""
+    st = os.stat(full_path)
+    stem = os.path.splitext(full_path)[0]
+    sig = [st.st_size, st.st_mtime_ns]
+    for suffix in SIDECAR_SUFFIXES:
+        try:
+            sig.append(os.stat(stem + suffix).st_mtime_ns)
+        except OSError:
+            sig.append(None)
+    return sig
+
+class LoraWatcher:
+    """Keeps the trigger DB in step with the lora folders without manual scans.
+
+    Every poll re-lists only directories whose mtime changed (via the scan
+    manifest, shared with the manager's scans). New or changed LoRAs wait until their signature has been stable
+    for `debounce` seconds, so files still being copied are not read. Ready files
+    that have no trigger yet go through the local engines and all of their
+    triggers are written in one set_triggers() call.
+
+    If the optional `watchdog` package is installed, filesystem events wake the
+    poll loop early; otherwise it simply polls every `interval` seconds.
+    """
+    def __init__(self, interval=10, debounce=5, workers=4):
+        self.interval = max(1, interval)
+        self.debounce = max(0, debounce)
+        self.workers = max(1, workers)
+        self.saver = LevelX_TriggerSaver()
+        self.snapshot = {}
+        # rel_path -> [full_path, sig, time the sig was last seen changing]
+        self.pending = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._thread is not None: return self._thread
+        self._thread = threading.Thread(target=self._loop, name="levelx-lora-watcher", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def _start_observer(self, roots):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+
+        wake = self._wake
+
+        class _Wake(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        observer = Observer()
+        for root in roots:
+            observer.schedule(_Wake(), root, recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return True
+
+    def _loop(self):
+        roots = [r for r in folder_paths.get_folder_paths("loras") if os.path.isdir(r)]
+        events = self._start_observer(roots)
+        print(f"[Level X] 👀 Watching {len(roots)} lora folder(s) "
+              f"({'filesystem events' if events else 'polling'}, every {self.interval}s)")
+        try:
+            with MANIFEST_LOCK:
+                manifest = get_scan_manifest()
+                self.snapshot = {rel: sig for rel, _, sig in self.saver.collect_lora_files(manifest)}
+                manifest.save()
+        except Exception as e:
+            print(f"[Level X] ⚠️ Watcher could not start: {e}")
+            return
+        while not self._stop.is_set():
+            # While files are settling, wake up in time to check them after the debounce
+            self._wake.wait(min(self.interval, self.debounce) if self.pending else self.interval)
+            self._wake.clear()
+            if self._stop.is_set(): break
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[Level X] ⚠️ Watcher poll failed: {e}")
+
+    # --- One poll ---
+    def poll(self, now=None):
+        """Detects changes, then extracts and saves every file that has settled. Returns the saved count."""
+        now = time.monotonic() if now is None else now
+        # Held for the whole poll, so a manual scan never interleaves with it
+        with MANIFEST_LOCK:
+            manifest = get_scan_manifest()
+            current = {}
+            for rel_path, full_path, sig in self.saver.collect_lora_files(manifest):
+                current[rel_path] = sig
+                if self.snapshot.get(rel_path) != sig and rel_path not in self.pending:
+                    self.pending[rel_path] = [full_path, sig, now]
+            self.snapshot = current
+
+            ready = []
+            for rel_path, entry in list(self.pending.items()):
+                full_path, sig, changed_at = entry
+                try:
+                    # Re-stat directly: a file growing in place does not change its directory's mtime
+                    latest = lora_file_sig(full_path)
+                except OSError:
+                    del self.pending[rel_path]
+                    continue
+                if latest != sig:
+                    entry[1], entry[2] = latest, now
+                elif now - changed_at >= self.debounce:
+                    ready.append((rel_path, full_path, sig))
+                    del self.pending[rel_path]
+                    manifest.update_sig(full_path, sig)
+                    self.snapshot[rel_path] = sig
+
+            saved = self.process(ready, manifest) if ready else 0
+            manifest.save()
+        return saved
+
+    def process(self, ready, manifest):
+        run = start_run("watcher")
+        run.count("files_changed", len(ready))
+        index = get_trigger_index()
+        # Same rule as SCAN LOCAL: entries that already have a trigger are never overwritten
+        todo = [item for item in ready if not index.lookup_exact(item[0])]
+        with run.stage("local_extract"), ThreadPoolExecutor(max_workers=self.workers) as pool:
+            found = list(pool.map(lambda item: self.saver.extract_local(item[1], item[2], run), todo))
+
+        new_entries = {}
+        for (rel_path, full_path, sig), trigger in zip(todo, found):
+            manifest.set_result(full_path, sig, trigger or None)
+            if trigger:
+                new_entries[rel_path] = trigger
+                print(f"   -> 👀 Found: {rel_path} = {trigger}")
+        with run.stage("save"):
+            set_triggers(new_entries)
+        run.finish()
+        return len(new_entries)
+
+_WATCHER = None
+
+def start_watcher():
+    """Starts the shared watcher if LEVELX_WATCH is set (_INTERVAL, _DEBOUNCE, _WORKERS tune it)."""
+    global _WATCHER
+    if os.environ.get("LEVELX_WATCH", "").strip().lower() not in ("1", "true", "yes", "on"): return None
+    if _WATCHER is None:
+        _WATCHER = LoraWatcher(
+            _env_int("LEVELX_WATCH_INTERVAL", 10),
+            _env_int("LEVELX_WATCH_DEBOUNCE", 5),
+            _env_int("LEVELX_WATCH_WORKERS", 4),
+        )
+        _WATCHER.start()
+    return _WATCHER